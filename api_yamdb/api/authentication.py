@@ -0,0 +1,183 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import is_cache_shared
+
+User = get_user_model()
+
+TOKEN_VERSION_KEY = 'token-version:{}'
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def get_cached_token_version(user_id):
+    return cache.get(TOKEN_VERSION_KEY.format(user_id))
+
+
+def cache_token_version(user):
+    # Версия, изменённая в обход сигналов (QuerySet.update, другая база
+    # кэша), перечитывается из базы не позже чем через это время.
+    cache.set(
+        TOKEN_VERSION_KEY.format(user.pk),
+        user.token_version,
+        settings.USER_CACHE_TIMEOUT,
+    )
+
+
+def forget_token_version(user_id):
+    cache.delete(TOKEN_VERSION_KEY.format(user_id))
+
+
+def get_access_token(user):
+    """JWT токен с данными пользователя, нужными для проверки прав."""
+    token = AccessToken.for_user(user)
+    for field in User.TOKEN_CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    cache_token_version(user)
+    return token
+
+
+def load_user(user):
+    """Загружает поля пользователя, которых не было в токене."""
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+class UserCache:
+    """LRU кэш пользователей в памяти процесса с ограниченным временем жизни.
+
+    Пользователь хранится вместе с версией токенов и отдаётся только для
+    токена той же версии. Записи удаляются сигналами при изменении и
+    удалении пользователя; изменения из других процессов становятся
+    видны не позже чем через USER_CACHE_TIMEOUT секунд.
+    """
+
+    def __init__(self):
+        self.users = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, token_version):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None:
+                user, expires = entry
+                if expires < time.monotonic():
+                    del self.users[user_id]
+                elif token_version in (None, user.token_version):
+                    self.users.move_to_end(user_id)
+                    self.hits += 1
+                    return self.copy_user(user)
+            self.misses += 1
+            return None
+
+    def set(self, user):
+        with self.lock:
+            self.users[user.pk] = (
+                self.copy_user(user),
+                time.monotonic() + settings.USER_CACHE_TIMEOUT,
+            )
+            self.users.move_to_end(user.pk)
+            while len(self.users) > settings.USER_CACHE_SIZE:
+                self.users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+            self.hits = self.misses = 0
+
+    @staticmethod
+    def copy_user(user):
+        """Копия, которую запрос может менять, не затрагивая кэш."""
+        user = copy.copy(user)
+        user._state = copy.copy(user._state)
+        user._state.fields_cache = {}
+        return user
+
+
+user_cache = UserCache()
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, который берёт пользователя из user_cache."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(
+            user_id, validated_token.get(TOKEN_VERSION_CLAIM)
+        )
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        return user
+
+
+class ClaimsJWTAuthentication(CachedUserJWTAuthentication):
+    """Аутентификация по JWT без запроса пользователя из базы.
+
+    Если токен выдан get_access_token и его версия совпадает с версией
+    пользователя в кэше, пользователь собирается из данных токена.
+    Остальные поля загружаются из базы при первом обращении к ним или
+    вызовом load_user. Иначе пользователь загружается из user_cache или
+    из базы, как в CachedUserJWTAuthentication.
+
+    Версии токенов сигналы обновляют в кэше default, поэтому данным
+    токена можно доверять, только если этот кэш общий для всех
+    процессов: с кэшем в памяти процесса пользователь всегда берётся из
+    user_cache или из базы.
+    """
+
+    def get_user(self, validated_token):
+        claims = (*User.TOKEN_CLAIM_FIELDS, TOKEN_VERSION_CLAIM)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not is_cache_shared() or any(
+            claim not in validated_token for claim in claims
+        ):
+            return super().get_user(validated_token)
+
+        version = get_cached_token_version(user_id)
+        if version is None:
+            user = super().get_user(validated_token)
+            cache_token_version(user)
+            version = user.token_version
+            if version == validated_token[TOKEN_VERSION_CLAIM]:
+                return user
+        if version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                'Токен устарел, получите новый.', code='token_outdated'
+            )
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        values = {'id': user_id}
+        values.update((claim, validated_token[claim]) for claim in claims)
+        # from_db ожидает значения в порядке полей модели.
+        field_names = [
+            field.attname for field in User._meta.concrete_fields
+            if field.attname in values
+        ]
+        return User.from_db(
+            router.db_for_read(User),
+            field_names,
+            [values[name] for name in field_names],
+        )
@@ -0,0 +1,233 @@
+import time
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from api.replicas import pin_recent_changes
+
+from reviews.models import CacheVersion
+
+VERSION_KEY = 'version:{}'
+# Бэкенды, кэш которых виден только своему процессу.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+RESPONSE_KEY = 'response:{}:{}:{}:{}:{}:{}'
+
+
+def is_cache_shared():
+    """Общий ли кэш default для всех процессов приложения."""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def get_versions(names):
+    """Текущие версии групп записей кэша.
+
+    Версии хранятся в таблице CacheVersion основной базы, поэтому их
+    меняют записи из любого процесса, в том числе команды управления.
+    Процесс держит прочитанные версии в кэше CACHE_VERSION_TIMEOUT
+    секунд; версия группы, которая ещё не менялась, равна 0.
+    """
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = [name for name, key in zip(names, keys) if key not in versions]
+    if missing:
+        stored = dict(CacheVersion.objects.using(DEFAULT_DB_ALIAS).filter(
+            name__in=missing
+        ).values_list('name', 'version'))
+        loaded = {
+            VERSION_KEY.format(name): stored.get(name, 0) for name in missing
+        }
+        cache.set_many(loaded, settings.CACHE_VERSION_TIMEOUT)
+        versions.update(loaded)
+    return tuple(versions[key] for key in keys)
+
+
+def get_version(name):
+    """Текущая версия группы записей кэша."""
+    return get_versions((name,))[0]
+
+
+def bump_versions(*names):
+    """Делает устаревшими все записи кэша с версиями names."""
+    version = time.time_ns()
+    names = set(names)
+    save_versions(names, version)
+    cache.set_many(
+        {VERSION_KEY.format(name): version for name in names},
+        settings.CACHE_VERSION_TIMEOUT,
+    )
+
+
+def save_versions(names, version):
+    # Версии читаются и пишутся в основной базе, даже если чтения
+    # запроса идут в реплику.
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor in ('sqlite', 'postgresql'):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {} ({}, {}) VALUES {} ON CONFLICT ({}) '
+                'DO UPDATE SET {} = excluded.{}'.format(
+                    quote(CacheVersion._meta.db_table),
+                    quote('name'),
+                    quote('version'),
+                    ', '.join(['(%s, %s)'] * len(names)),
+                    quote('name'),
+                    quote('version'),
+                    quote('version'),
+                ),
+                [value for name in names for value in (name, version)],
+            )
+        return
+    versions = CacheVersion.objects.using(DEFAULT_DB_ALIAS)
+    if versions.filter(name__in=names).update(version=version) < len(names):
+        versions.bulk_create(
+            [CacheVersion(name=name, version=version) for name in names],
+            ignore_conflicts=True,
+        )
+
+
+def bump_versions_on_commit(*names):
+    """Меняет версии names после фиксации текущей транзакции.
+
+    Версии из всех вызовов в одной транзакции меняются одним запросом.
+    Имена из отменённой транзакции остаются в очереди и сбрасываются
+    вместе со следующими: это лишь лишний раз обновит кэш.
+    """
+    connection = transaction.get_connection()
+    pending = connection.__dict__.setdefault('pending_cache_versions', set())
+    pending.update(names)
+
+    def bump():
+        if pending:
+            names = tuple(pending)
+            pending.clear()
+            bump_versions(*names)
+
+    transaction.on_commit(bump)
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_admin:
+        return user.ADMIN
+    return user.role
+
+
+class VersionedViewMixin:
+    """Версии данных, от которых зависят ответы view.
+
+    Версии меняются сигналами в api/signals.py при изменении данных.
+    По умолчанию ответ зависит от версии cache_namespace и от версии
+    действия list или конкретного объекта для retrieve.
+    """
+
+    cache_namespace = None
+
+    def get_cache_versions(self):
+        if self.action == 'retrieve':
+            scope = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        else:
+            scope = self.action
+        namespace = self.cache_namespace
+        return (namespace, f'{namespace}:{scope}')
+
+    def get_version_values(self):
+        if not hasattr(self, '_version_values'):
+            self._version_values = get_versions(self.get_cache_versions())
+            # Ответ с этими версиями попадёт в кэш или получит ETag,
+            # поэтому он не должен читать отстающую реплику.
+            pin_recent_changes(self.request._request, self._version_values)
+        return self._version_values
+
+    def get_cache_key_parts(self, request):
+        return (
+            ':'.join(str(version) for version in self.get_version_values()),
+            get_role(request.user),
+            # Ссылки next и previous в ответе абсолютные.
+            request.scheme,
+            request.get_host(),
+            request.path,
+            urlencode(sorted(request.query_params.lists()), doseq=True),
+        )
+
+
+class CachedResponseMixin(VersionedViewMixin):
+    """Кэширует ответы list для GET запросов.
+
+    Ключ строится из схемы, хоста, пути и параметров запроса, роли
+    пользователя и версий данных из get_cache_versions.
+    """
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = RESPONSE_KEY.format(*self.get_cache_key_parts(request))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class CachedDetailResponseMixin(CachedResponseMixin):
+    """Кэширует ответы list и retrieve для GET запросов."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin(VersionedViewMixin):
+    """Отвечает 304 на условные GET запросы к list.
+
+    ETag и Last-Modified вычисляются по версиям данных без сериализации
+    ответа. Версия хранит время последнего изменения, поэтому служит и
+    датой Last-Modified; пока данные не менялись, Last-Modified нет.
+    """
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag = quote_etag(md5(
+            ':'.join(self.get_cache_key_parts(request)).encode()
+        ).hexdigest())
+        last_modified = max(self.get_version_values()) // 10 ** 9 or None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalDetailGetMixin(ConditionalGetMixin):
+    """Отвечает 304 на условные GET запросы к list и retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from api.cache import is_cache_shared
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    """Реплики требуют общего кэша для закрепления пользователей."""
+    if not settings.DATABASE_REPLICAS or is_cache_shared():
+        return []
+    return [Warning(
+        'DB_REPLICAS задан, а кэш default виден только своему процессу.',
+        hint=(
+            'Отметка REPLICA_PIN_TIMEOUT о запросе на запись хранится в '
+            'кэше: с несколькими процессами пользователь может не увидеть '
+            'свои изменения. Укажите в CACHES общий бэкенд, например Redis '
+            'или Memcached.'
+        ),
+        id='api.W001',
+    )]
@@ -1,6 +1,7 @@
 from django_filters import rest_framework as f
 
 from reviews.models import Title
+from reviews.search import search_titles
 
 
 class FilterByTitle(f.FilterSet):
@@ -9,7 +10,11 @@ class FilterByTitle(f.FilterSet):
     category = f.CharFilter(field_name='category__slug')
     genre = f.CharFilter(field_name='genre__slug')
     name = f.CharFilter(field_name='name', lookup_expr='icontains')
+    search = f.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
         fields = ('name', 'year', 'category', 'genre')
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
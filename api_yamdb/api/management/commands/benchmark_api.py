@@ -0,0 +1,452 @@
+import json
+import math
+import time
+from collections import Counter
+from contextlib import ExitStack
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.authentication import get_access_token, user_cache
+from api.middleware import QueryCounter
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+DEFAULT_DATABASE_NAME = settings.BASE_DIR / 'benchmark.sqlite3'
+PERCENTILES = (50, 95, 99)
+BATCH_SIZE = 10
+
+
+class Route:
+    """Запрос к API, который повторяется при измерении.
+
+    cleanup вызывается после каждого запроса вне измерения, чтобы
+    запросы на запись можно было повторять.
+    """
+
+    def __init__(self, name, method, path, status=200, user=None,
+                 data=None, cleanup=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.status = status
+        self.user = user
+        self.data = data
+        self.cleanup = cleanup
+
+
+def get_context():
+    """Объекты из базы, к которым обращаются маршруты."""
+    review = Review.objects.annotate(
+        comments_count=Count('comments')
+    ).order_by('-comments_count', 'id').first()
+    comment = review and review.comments.order_by('id').first()
+    if comment is None:
+        raise CommandError(
+            'В базе нет комментариев: заполните её командой generate_data.'
+        )
+    admin, _ = User.objects.get_or_create(
+        username='benchmark-admin',
+        defaults={'email': 'benchmark-admin@yamdb.fake', 'role': User.ADMIN},
+    )
+    user, _ = User.objects.get_or_create(
+        username='benchmark-user',
+        defaults={'email': 'benchmark-user@yamdb.fake'},
+    )
+    title = review.title
+    quiet = list(Title.objects.exclude(
+        reviews__author=user
+    ).order_by('rating_count', 'id').values_list('id', flat=True)[
+        :BATCH_SIZE
+    ])
+    bulk = Title.objects.filter(category__isnull=False).select_related(
+        'category'
+    ).prefetch_related('genre').order_by('id')[:BATCH_SIZE]
+    return {
+        'admin': admin,
+        'user': user,
+        'tokens': {
+            admin: str(get_access_token(admin)),
+            user: str(get_access_token(user)),
+        },
+        'title': title,
+        'review': review,
+        'comment': comment,
+        'quiet': quiet,
+        'bulk': [
+            {
+                'id': obj.id,
+                'name': obj.name,
+                'year': obj.year,
+                'category': obj.category.slug,
+                'genre': [genre.slug for genre in obj.genre.all()],
+                'description': obj.description,
+            }
+            for obj in bulk
+        ],
+        'category': Category.objects.annotate(
+            titles_count=Count('titles')
+        ).order_by('-titles_count', 'id').first(),
+        'genre': Genre.objects.annotate(
+            titles_count=Count('titles')
+        ).order_by('-titles_count', 'id').first(),
+        'word': title.name.split()[0],
+        'last_page': max(
+            math.ceil(
+                Title.objects.count()
+                / settings.REST_FRAMEWORK['PAGE_SIZE']
+            ),
+            1
+        ),
+    }
+
+
+def get_routes(context):
+    """Маршруты всех эндпоинтов api/urls.py; запросы на запись — в конце."""
+    admin = context['admin']
+    user = context['user']
+    title = context['title']
+    review = context['review']
+    titles = '/api/v1/titles/'
+    reviews = f'{titles}{title.id}/reviews/'
+    comments = f'{reviews}{review.id}/comments/'
+
+    def delete_reviews():
+        Review.objects.filter(author=user).delete()
+
+    def delete_comments():
+        Comment.objects.filter(author=user).delete()
+
+    return [
+        Route('categories', 'GET', '/api/v1/categories/'),
+        Route('genres', 'GET', '/api/v1/genres/'),
+        Route('titles', 'GET', titles),
+        Route('titles_last_page', 'GET',
+              f'{titles}?page={context["last_page"]}'),
+        Route('titles_cursor', 'GET', f'{titles}?cursor='),
+        Route('titles_category', 'GET',
+              f'{titles}?category={context["category"].slug}'),
+        Route('titles_genre', 'GET',
+              f'{titles}?genre={context["genre"].slug}'),
+        Route('titles_year', 'GET', f'{titles}?year={title.year}'),
+        Route('titles_name', 'GET',
+              f'{titles}?{urlencode({"name": context["word"]})}'),
+        Route('titles_search', 'GET',
+              f'{titles}?{urlencode({"search": context["word"]})}'),
+        Route('titles_top', 'GET', f'{titles}top/'),
+        Route('titles_trending', 'GET', f'{titles}trending/'),
+        Route('titles_fields', 'GET', f'{titles}?fields=id,name,rating'),
+        Route('title', 'GET', f'{titles}{title.id}/'),
+        Route('reviews', 'GET', reviews),
+        Route('reviews_cursor', 'GET', f'{reviews}?cursor='),
+        Route('review', 'GET', f'{reviews}{review.id}/'),
+        Route('comments', 'GET', comments),
+        Route('comments_cursor', 'GET', f'{comments}?cursor='),
+        Route('comment', 'GET', f'{comments}{context["comment"].id}/'),
+        Route('users', 'GET', '/api/v1/users/', user=admin),
+        Route('users_search', 'GET', '/api/v1/users/?search=user',
+              user=admin),
+        Route('user', 'GET', f'/api/v1/users/{user.username}/', user=admin),
+        Route('me', 'GET', '/api/v1/users/me/', user=user),
+        Route('signup', 'POST', '/api/v1/auth/signup/', data={
+            'username': user.username, 'email': user.email
+        }),
+        Route('token', 'POST', '/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        }),
+        Route('title_update', 'PATCH', f'{titles}{title.id}/', user=admin,
+              data={'description': title.description}),
+        Route('titles_bulk', 'POST', f'{titles}bulk/', user=admin,
+              data=context['bulk']),
+        Route('review_create', 'POST',
+              f'{titles}{context["quiet"][0]}/reviews/', status=201,
+              user=user, data={'text': 'Отзыв', 'score': 7},
+              cleanup=delete_reviews),
+        Route('reviews_batch', 'POST', '/api/v1/reviews/batch/',
+              status=201, user=user, data=[
+                  {'title': title_id, 'text': 'Отзыв', 'score': 7}
+                  for title_id in context['quiet']
+              ], cleanup=delete_reviews),
+        Route('comment_create', 'POST', comments, status=201, user=user,
+              data={'text': 'Комментарий'}, cleanup=delete_comments),
+    ]
+
+
+def call(application, method, path, data=None, token=None):
+    """Выполняет запрос через WSGI приложение, возвращает код ответа."""
+    path, _, query = path.partition('?')
+    body = b'' if data is None else json.dumps(data).encode()
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return statuses[0]
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def summarize(route, latencies, queries, statuses):
+    result = {
+        'method': route.method,
+        'path': route.path,
+        'requests': len(latencies),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}'] = round(
+            percentile(latencies, percent) * 1000, 3
+        )
+    result['rps'] = round(len(latencies) / sum(latencies), 1)
+    result['queries'] = round(sum(queries) / len(queries), 2)
+    result['errors'] = sum(
+        count for status, count in statuses.items() if status != route.status
+    )
+    result['statuses'] = {
+        str(status): count for status, count in sorted(statuses.items())
+    }
+    return result
+
+
+def find_regressions(results, baseline, threshold):
+    """Маршруты, которые стали медленнее порога или делают больше запросов.
+
+    Сравниваются p95, количество запросов в секунду и среднее количество
+    SQL запросов маршрутов, которые есть в обоих результатах.
+    """
+    regressions = []
+    for name, result in results['routes'].items():
+        base = baseline['routes'].get(name)
+        if base is None:
+            continue
+        if result['p95'] > base['p95'] * (1 + threshold):
+            regressions.append(
+                f'{name}: p95 {base["p95"]} -> {result["p95"]} мс'
+            )
+        if result['rps'] < base['rps'] / (1 + threshold):
+            regressions.append(
+                f'{name}: {base["rps"]} -> {result["rps"]} запросов/с'
+            )
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: SQL запросов {base["queries"]} -> '
+                f'{result["queries"]}'
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    """Измеряет задержку и пропускную способность эндпоинтов API"""
+
+    help = (
+        'Заполняет отдельную базу данных командой generate_data и '
+        'выполняет запросы ко всем эндпоинтам API через WSGI приложение '
+        'в том же процессе. Выводит p50/p95/p99 задержки, количество '
+        'запросов в секунду и SQL запросов на запрос, сохраняет результат '
+        'в JSON и сравнивает его с сохранённым ранее.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Количество измеряемых запросов к каждому маршруту',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Количество запросов к маршруту перед измерением',
+        )
+        parser.add_argument(
+            '--routes',
+            nargs='*',
+            help='Измерять только маршруты, в имени которых есть строка',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэши перед каждым запросом',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для сохранения результата в JSON',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Файл с результатом, с которым сравнивается текущий',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимое относительное ухудшение p95 и запросов/с',
+        )
+        parser.add_argument(
+            '--database-name',
+            default=str(DEFAULT_DATABASE_NAME),
+            help='Файл базы данных SQLite для измерений',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Не удалять базу данных и не заполнять её повторно',
+        )
+        parser.add_argument(
+            '--current-database',
+            action='store_true',
+            help='Измерять на настроенной базе данных, не создавая новую',
+        )
+        for name, default in (
+            ('users', 1000),
+            ('titles', 10000),
+            ('reviews', 100000),
+            ('comments', 100000),
+            ('seed', 0),
+        ):
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Параметр --{name} команды generate_data',
+            )
+
+    def handle(self, *args, **options):
+        if options['current_database']:
+            return self.benchmark(options)
+        connection.settings_dict['TEST']['NAME'] = options['database_name']
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+            keepdb=options['keepdb'],
+        )
+        try:
+            # Реплики настроены на другую базу, а не на созданную здесь.
+            with override_settings(DATABASE_REPLICAS=[]):
+                self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+
+    def benchmark(self, options):
+        if not Title.objects.exists():
+            call_command(
+                'generate_data',
+                **{
+                    name: options[name]
+                    for name in ('users', 'titles', 'reviews', 'comments',
+                                 'seed')
+                },
+                stdout=self.stdout,
+            )
+        context = get_context()
+        routes = get_routes(context)
+        if options['routes']:
+            routes = [
+                route for route in routes
+                if any(part in route.name for part in options['routes'])
+            ]
+        application = get_wsgi_application()
+        results = {
+            'created': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'dataset': {
+                model._meta.model_name: model.objects.count()
+                for model in (User, Title, Review, Comment)
+            },
+            'routes': {},
+        }
+        # В режиме DEBUG Django сохраняет каждый SQL запрос в памяти.
+        with override_settings(DEBUG=False):
+            for route in routes:
+                result = self.measure(
+                    application, route, context, options
+                )
+                results['routes'][route.name] = result
+                self.stdout.write(
+                    f'{route.name:<18} p50 {result["p50"]:8.2f} '
+                    f'p95 {result["p95"]:8.2f} p99 {result["p99"]:8.2f} мс '
+                    f'{result["rps"]:8.1f} запросов/с '
+                    f'{result["queries"]:5.1f} SQL'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        failed = [
+            f'{name}: ответы {result["statuses"]}'
+            for name, result in results['routes'].items()
+            if result['errors']
+        ]
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                failed.extend(find_regressions(
+                    results, json.load(baseline), options['threshold']
+                ))
+        if failed:
+            raise CommandError('\n'.join(failed))
+
+    def measure(self, application, route, context, options):
+        token = context['tokens'].get(route.user)
+        latencies = []
+        queries = []
+        statuses = Counter()
+        counter = QueryCounter()
+        for number in range(options['warmup'] + options['requests']):
+            if options['cold']:
+                cache.clear()
+                user_cache.clear()
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(counter)
+                    )
+                before = counter.count
+                started = time.perf_counter()
+                status = call(
+                    application, route.method, route.path, route.data, token
+                )
+                elapsed = time.perf_counter() - started
+                count = counter.count - before
+            if route.cleanup:
+                route.cleanup()
+            if number >= options['warmup']:
+                latencies.append(elapsed)
+                queries.append(count)
+                statuses[status] += 1
+        return summarize(route, latencies, queries, statuses)
@@ -0,0 +1,109 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import (COMMENT_ROWS, GENRES, REVIEW_ROWS, TITLE_ROWS,
+                             CommentSerializer, ReviewSerializer,
+                             TitleSerializer)
+from reviews.models import Comment, Review, Title
+
+
+def measure(serialize, repeat):
+    """Количество сериализованных объектов в секунду."""
+    count = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        count += len(serialize())
+    return count / (time.perf_counter() - started)
+
+
+def measure_render(renderer, data, repeat):
+    """Количество ответов из data, закодированных в JSON за секунду."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        renderer.render(data)
+    return repeat / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    """Сравнивает скорость сериализаторов и RowMapper на данных из базы"""
+
+    help = (
+        'Измеряет количество объектов в секунду, которое выводят '
+        'сериализаторы и RowMapper для списков API, и скорость '
+        'кодирования этих списков в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Количество объектов каждой модели',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Количество повторов измерения',
+        )
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        repeat = options['repeat']
+        request = Request(RequestFactory().get('/'))
+        cases = (
+            (
+                'titles',
+                Title.objects.select_related('category').prefetch_related(
+                    GENRES
+                ),
+                TitleSerializer,
+                TITLE_ROWS,
+            ),
+            (
+                'reviews',
+                Review.objects.select_related('author'),
+                ReviewSerializer,
+                REVIEW_ROWS,
+            ),
+            (
+                'comments',
+                Comment.objects.select_related('author'),
+                CommentSerializer,
+                COMMENT_ROWS,
+            ),
+        )
+        for name, queryset, serializer_class, mapper in cases:
+            objects = list(queryset[:limit])
+            rows = list(queryset.values(*mapper.paths)[:limit])
+            if not objects:
+                self.stdout.write(f'{name}: нет данных')
+                continue
+            before = measure(
+                lambda: serializer_class(
+                    objects, many=True, context={'request': request}
+                ).data,
+                repeat,
+            )
+            # Время RowMapper включает запрос связанных списков, который
+            # выполняется при выводе каждой страницы.
+            after = measure(lambda: mapper.map(rows), repeat)
+            self.stdout.write(
+                f'{name}: сериализатор {before:.0f} объектов/с, '
+                f'RowMapper {after:.0f} объектов/с '
+                f'(в {after / before:.1f} раза быстрее)'
+            )
+            data = mapper.map(rows)
+            before = measure_render(JSONRenderer(), data, repeat)
+            after = measure_render(FastJSONRenderer(), data, repeat)
+            self.stdout.write(
+                f'{name}: JSONRenderer {before:.0f} ответов/с, '
+                f'FastJSONRenderer {after:.0f} ответов/с '
+                f'(в {after / before:.1f} раза быстрее'
+                f'{"" if orjson else ", orjson не установлен"})'
+            )
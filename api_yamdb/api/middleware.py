@@ -0,0 +1,109 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+from rest_framework.permissions import SAFE_METHODS
+
+from api.replicas import current_request, get_request_user, pin_user
+
+logger = logging.getLogger(__name__)
+
+query_budget_exceeded = Signal()
+
+
+class QueryCounter:
+    """Считает SQL запросы и время их выполнения."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def get_query_budget(view_func, method):
+    """Возвращает лимит запросов, объявленный во view для метода."""
+    view_class = getattr(view_func, 'cls', None)
+    budgets = getattr(view_class, 'query_budget', None)
+    if not budgets:
+        return None, None
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}', budgets.get(action)
+
+
+class QueryCountMiddleware:
+    """Считает SQL запросы каждого запроса к API и сверяет их с лимитом.
+
+    Лимиты задаются атрибутом query_budget во view: словарь
+    {действие: количество запросов}. При превышении отправляется
+    сигнал query_budget_exceeded. В режиме DEBUG количество и время
+    запросов возвращаются в заголовках ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        route, budget = getattr(request, 'query_budget', (None, None))
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                '%s: %s SQL запросов при лимите %s',
+                route, counter.count, budget
+            )
+            query_budget_exceeded.send(
+                sender=self.__class__,
+                route=route,
+                count=counter.count,
+                budget=budget,
+            )
+        if settings.DEBUG:
+            response['X-Query-Count'] = counter.count
+            response['X-Query-Time'] = f'{counter.duration * 1000:.2f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+
+
+class ReplicaMiddleware:
+    """Включает чтение из реплик для запроса и закрепляет пользователя.
+
+    Пока обрабатывается запрос, ReplicaRouter может направлять его чтения
+    в реплики. После успешного запроса на запись чтения пользователя
+    на время REPLICA_PIN_TIMEOUT идут в основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            user = get_request_user(request)
+            if user is not None and user.is_authenticated:
+                pin_user(user)
+        return response
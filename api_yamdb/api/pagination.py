@@ -0,0 +1,346 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import DateTimeField, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from api.cache import bump_versions_on_commit, get_versions
+
+COUNT_KEY = 'pagination-count:{}:{}:{}'
+
+
+def get_count_version_name(model, scope=None):
+    name = f'count:{model._meta.label}'
+    if scope is None:
+        return name
+    return f'{name}:{scope}'
+
+
+def invalidate_counts(model, *scopes):
+    """Сбрасывает закэшированные количества объектов модели.
+
+    Без scopes сбрасываются все количества модели, иначе только списков
+    с этими областями, например 'title=1' для отзывов одного произведения.
+    Версия меняется после фиксации транзакции, чтобы запись версии не
+    блокировала другие транзакции с объектами модели.
+    """
+    if not scopes:
+        scopes = (None,)
+    bump_versions_on_commit(*(
+        get_count_version_name(model, scope) for scope in scopes
+    ))
+
+
+def estimate_count(queryset):
+    """Оценка количества строк по плану запроса, если СУБД её даёт."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """Paginator, который кэширует количество объектов.
+
+    Ключ кэша строится по SQL запросу, то есть по набору фильтров, и по
+    версии модели, которая меняется при создании и удалении объектов.
+    Для списка с областью count_scope, например отзывов одного
+    произведения, добавляется версия области: запись в другой области
+    не сбрасывает его количество.
+    Если объектов больше PAGINATION_EXACT_COUNT_LIMIT, точный подсчёт
+    заменяется оценкой и count_is_approximate становится True. Оценка
+    может быть меньше настоящего количества, поэтому тогда номер страницы
+    не сравнивается с num_pages: страница и ссылка next определяются по
+    выбранным строкам.
+    """
+
+    count_is_approximate = False
+
+    def __init__(self, *args, count_scope=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_scope = count_scope
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        names = [get_count_version_name(queryset.model)]
+        if self.count_scope is not None:
+            names.append(
+                get_count_version_name(queryset.model, self.count_scope)
+            )
+        key = COUNT_KEY.format(
+            queryset.model._meta.label,
+            ':'.join(str(version) for version in get_versions(names)),
+            md5(str(queryset.query).encode()).hexdigest(),
+        )
+        count = cache.get(key)
+        if count is None:
+            count = self.get_count(queryset)
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        count, self.count_is_approximate = count
+        return count
+
+    @staticmethod
+    def get_count(queryset):
+        limit = settings.PAGINATION_EXACT_COUNT_LIMIT
+        if limit is None:
+            return queryset.count(), False
+        count = queryset[:limit + 1].count()
+        if count <= limit:
+            return count, False
+        return max(estimate_count(queryset) or 0, count), True
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_approximate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        return ApproximateCountPage(
+            object_list[:self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
+
+
+class ApproximateCountPage(Page):
+    """Страница, наличие следующей страницы для которой известно из выборки."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная пагинация с кэшированным количеством объектов.
+
+    Область количества задаёт метод view get_count_scope.
+    """
+
+    count_scope = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        get_count_scope = getattr(view, 'get_count_scope', None)
+        if get_count_scope is not None:
+            self.count_scope = get_count_scope()
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        return CachedCountPaginator(
+            queryset, page_size, count_scope=self.count_scope
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.page.paginator.count_is_approximate:
+            response.data['count_is_approximate'] = True
+        return response
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу сортировки вместо OFFSET.
+
+    Курсор хранит значения полей ordering последнего объекта страницы,
+    поэтому страница N выбирается по индексу так же быстро, как первая.
+    Последнее поле ordering должно быть уникальным.
+    """
+
+    ordering = ('-pub_date', '-id')
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        values, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param), queryset.model
+        )
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.get_keyset_filter(
+                ordering, values
+            ))
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+        self.has_next = bool(page) and (has_more or reverse)
+        self.has_previous = bool(page) and (
+            values is not None and not reverse or has_more and reverse
+        )
+        self.page = page
+        return page
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    @staticmethod
+    def get_keyset_filter(ordering, values):
+        """Условие «строго после values» для сортировки ordering.
+
+        Первое условие ограничивает диапазон первого поля, чтобы СУБД
+        читала индекс с позиции курсора, а не объединяла результаты
+        условий OR и сортировала их заново.
+        """
+        first = ordering[0]
+        keyset_filter = Q()
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': values[position]})
+            for previous, value in zip(ordering[:position], values):
+                condition &= Q(**{previous.lstrip('-'): value})
+            keyset_filter |= condition
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & (
+            keyset_filter
+        )
+
+    @staticmethod
+    def get_value(obj, field):
+        # Страница может состоять из строк .values().
+        if isinstance(obj, dict):
+            return obj[field]
+        return getattr(obj, field)
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            self.get_value(obj, field.lstrip('-')) for field in self.ordering
+        ]
+        cursor = json.dumps([values, reverse], default=str)
+        return urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        """Значения и направление курсора, приведённые к типам полей.
+
+        Курсор приходит от клиента, поэтому значения, которые нельзя
+        сравнить с полями ordering, дают 404, а не ошибку запроса к базе.
+        """
+        if not cursor:
+            return None, False
+        try:
+            values, reverse = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (BinasciiError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return [
+            self.to_python(model, field.lstrip('-'), value)
+            for field, value in zip(self.ordering, values)
+        ], bool(reverse)
+
+    def to_python(self, model, name, value):
+        field = model._meta.get_field(name)
+        try:
+            value = field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            settings.USE_TZ and isinstance(field, DateTimeField)
+            and timezone.is_naive(value)
+        ):
+            value = timezone.make_aware(value)
+        return value
+
+    def get_link(self, obj, reverse):
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(obj, reverse)
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_link(self.page[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_link(self.page[0], True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class OptionalKeysetPagination(CachedCountPagination):
+    """Постраничная пагинация с переходом на курсор по запросу.
+
+    Если в запросе есть параметр cursor (для первой страницы пустой),
+    страницы выбираются по ключу keyset_ordering без COUNT и OFFSET.
+    """
+
+    keyset_ordering = ('-pub_date', '-id')
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = KeysetPagination()
+        self.keyset.ordering = self.keyset_ordering
+        self.keyset.page_size = self.get_page_size(request)
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return self.keyset.get_paginated_response(data)
+
+
+class TitlePagination(OptionalKeysetPagination):
+    """Пагинация произведений с курсором по названию.
+
+    Ключ name, id поддерживается индексом title_name_idx, поэтому обход
+    всего каталога по ссылкам next не перечитывает предыдущие страницы.
+    """
+
+    keyset_ordering = ('name', 'id')
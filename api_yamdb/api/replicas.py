@@ -0,0 +1,106 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'replica-pin:{}'
+
+# Запрос, который обрабатывается в текущем потоке, задаёт ReplicaMiddleware.
+current_request = ContextVar('current_request', default=None)
+
+
+def pin_user(user):
+    """Направляет чтения пользователя в основную базу.
+
+    Закрепление действует REPLICA_PIN_TIMEOUT секунд, чтобы пользователь
+    видел свои изменения, пока их нет в репликах.
+    """
+    cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_TIMEOUT)
+
+
+def get_request_user(request):
+    """Пользователь запроса или None, если он ещё не определён.
+
+    Ленивый пользователь AuthenticationMiddleware не вычисляется: это
+    запрос к базе, который сам пришёл бы в роутер.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        return None if user._wrapped is empty else user._wrapped
+    return user
+
+
+def is_pinned(request):
+    """Нужно ли читать данные запроса из основной базы."""
+    if request is None or request.method not in SAFE_METHODS:
+        return True
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return True
+    pinned = getattr(request, 'replica_pinned', None)
+    if pinned is None:
+        user = get_request_user(request)
+        if user is None:
+            return False
+        pinned = user.is_authenticated and cache.get(
+            PIN_KEY.format(user.pk)
+        ) is not None
+        request.replica_pinned = pinned
+    return pinned
+
+
+def pin_recent_changes(request, versions):
+    """Направляет чтения запроса в основную базу после изменения данных.
+
+    Версия данных хранит время изменения. Пока с него не прошло
+    REPLICA_PIN_TIMEOUT секунд, реплика может ещё не получить изменение,
+    а ответ из неё попал бы в кэш и получил бы ETag новой версии.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return
+    changed = max(versions, default=0)
+    if time.time_ns() - changed < settings.REPLICA_PIN_TIMEOUT * 10 ** 9:
+        request.replica_pinned = True
+
+
+class ReplicaRouter:
+    """Отправляет чтения приложений reviews и api на реплики.
+
+    Реплики из DATABASE_REPLICAS используются только для безопасных
+    запросов к API, обработанных ReplicaMiddleware; все запросы одного
+    HTTP запроса читают из одной реплики. Запись, чтения в запросах на
+    запись и в транзакциях, команды и миграции работают с основной базой,
+    как и чтения пользователя в течение REPLICA_PIN_TIMEOUT секунд после
+    его запроса на запись и чтения кэшируемых ответов в течение
+    REPLICA_PIN_TIMEOUT секунд после изменения их данных.
+    """
+
+    app_labels = {'reviews', 'api'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.app_labels:
+            return None
+        replicas = settings.DATABASE_REPLICAS
+        request = current_request.get()
+        if not replicas or is_pinned(request):
+            return DEFAULT_DB_ALIAS
+        if getattr(request, 'replica', None) not in replicas:
+            request.replica = random.choice(replicas)
+        return request.replica
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django записал бы объект, прочитанный из
+        # реплики, обратно в реплику.
+        if model._meta.app_label in self.app_labels:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
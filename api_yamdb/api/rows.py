@@ -0,0 +1,146 @@
+from operator import itemgetter
+
+from rest_framework.response import Response
+
+
+class Column:
+    """Поле ответа из одной или нескольких колонок запроса.
+
+    Без convert значение берётся из единственной колонки как есть,
+    иначе в convert передаются значения всех колонок. Значение None
+    передаётся в ответ без convert, как это делает сериализатор.
+    """
+
+    def __init__(self, *paths, convert=None):
+        self.paths = paths
+        self.convert = convert
+
+    def compile(self):
+        get = itemgetter(*self.paths)
+        convert = self.convert
+        if convert is None:
+            return get
+        if len(self.paths) == 1:
+            def column(row):
+                value = get(row)
+                return None if value is None else convert(value)
+        else:
+            def column(row):
+                return convert(*get(row))
+        return column
+
+
+class Nested:
+    """Вложенный объект из колонок связанной модели.
+
+    Если колонка key пуста, вместо объекта выводится None.
+    """
+
+    def __init__(self, key, fields):
+        self.key = key
+        self.mapper = RowMapper(fields)
+        self.paths = (key, *self.mapper.paths)
+
+    def compile(self):
+        get_key = itemgetter(self.key)
+        build = self.mapper.build
+
+        def nested(row):
+            return None if get_key(row) is None else build(row)
+        return nested
+
+
+class Prefetched:
+    """Список связанных объектов, загружаемый одним запросом на страницу.
+
+    load получает значения колонки key всех строк страницы и возвращает
+    словарь {значение key: список объектов}.
+    """
+
+    def __init__(self, key, load):
+        self.key = key
+        self.load = load
+        self.paths = (key,)
+
+    def compile(self):
+        # Значение подставляет RowMapper.map после загрузки списков.
+        return lambda row: None
+
+
+class RowMapper:
+    """Строит ответ списка из строк .values() без сериализатора.
+
+    Поля описываются декларативно: путь колонки, Column, Nested или
+    Prefetched. Функции чтения полей строятся один раз при создании,
+    а на каждую строку выполняется только сборка словаря.
+    """
+
+    def __init__(self, fields):
+        self.fields = {
+            name: Column(spec) if isinstance(spec, str) else spec
+            for name, spec in fields.items()
+        }
+        self.paths = tuple(dict.fromkeys(
+            path for spec in self.fields.values() for path in spec.paths
+        ))
+        self.getters = tuple(
+            (name, spec.compile()) for name, spec in self.fields.items()
+        )
+        self.prefetched = tuple(
+            (name, spec) for name, spec in self.fields.items()
+            if isinstance(spec, Prefetched)
+        )
+        self.subsets = {}
+
+    def select(self, names):
+        """Mapper для части полей или None, если поле не описано."""
+        names = tuple(names)
+        if names not in self.subsets:
+            if all(name in self.fields for name in names):
+                self.subsets[names] = RowMapper(
+                    {name: self.fields[name] for name in names}
+                )
+            else:
+                self.subsets[names] = None
+        return self.subsets[names]
+
+    def build(self, row):
+        return {name: get(row) for name, get in self.getters}
+
+    def map(self, rows):
+        data = [self.build(row) for row in rows]
+        for name, spec in self.prefetched:
+            get_key = itemgetter(spec.key)
+            loaded = spec.load({get_key(row) for row in rows})
+            for item, row in zip(data, rows):
+                item[name] = loaded.get(get_key(row), [])
+        return data
+
+
+class RowMapperListMixin:
+    """Отвечает на list через row_mapper без сериализатора.
+
+    Ответ совпадает с ответом serializer_class. Если сериализатор
+    выводит поле, которого нет в row_mapper, используется обычный list.
+    """
+
+    row_mapper = None
+
+    def get_row_mapper(self):
+        if self.row_mapper is None:
+            return None
+        return self.row_mapper.select(self.get_serializer().fields)
+
+    def list(self, request, *args, **kwargs):
+        mapper = self.get_row_mapper()
+        if mapper is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(
+            self.get_queryset()
+        ).prefetch_related(None).values(
+            *mapper.paths, *getattr(self, 'ordering_fields', ())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(mapper.map(list(queryset)))
+        return self.get_paginated_response(mapper.map(page))
@@ -1,19 +1,65 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Max
+from django.db.models.query import Prefetch
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 
-from api.utils import UsernameCharField
-from reviews.models import Category, Comment, Genre, Review, Title
+from api.rows import Column, Nested, Prefetched, RowMapper
+from api.utils import UsernameCharField, get_expanded, get_query_list
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleStats)
+from reviews.signals import titles_bulk_saved
 
 User = get_user_model()
 
+# Жанры произведения выводятся в порядке добавления жанров.
+GENRES = Prefetch('genre', queryset=Genre.objects.order_by('id'))
 
-class ReviewSerializer(serializers.ModelSerializer):
+
+class SparseFieldsSerializerMixin:
+    """Поля ответа на GET по параметрам запроса fields и expand.
+
+    fields оставляет в ответе только перечисленные поля. Поля из
+    expandable_fields выводятся, только если перечислены в expand.
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expanded = get_expanded(request)
+        for name in self.expandable_fields:
+            if name not in expanded:
+                self.fields.pop(name)
+        if request is None or request.method != 'GET':
+            return
+        fields = get_query_list(request, 'fields')
+        if fields:
+            for name in set(self.fields) - fields - expanded:
+                self.fields.pop(name)
+
+
+class TitleBriefSerializer(serializers.ModelSerializer):
+    """Краткие данные произведения в отзыве"""
+
+    class Meta:
+        fields = ('id', 'name', 'year')
+        model = Title
+
+
+class ReviewSerializer(SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     """Сериализатор для отзывов"""
     author = SlugRelatedField(slug_field='username', read_only=True)
+    title = TitleBriefSerializer(read_only=True)
+
+    expandable_fields = ('title',)
 
     class Meta:
-        exclude = ('title',)
+        fields = ('id', 'text', 'author', 'score', 'pub_date', 'title')
         model = Review
 
     def validate(self, data):
@@ -29,14 +75,40 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class ReviewBatchItemSerializer(serializers.ModelSerializer):
+    """Отзыв из пакетной загрузки.
+
+    Существование произведения и повторные отзывы проверяются во view
+    сразу для всей пачки.
+    """
+    title = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        fields = ('title', 'text', 'score')
+        model = Review
+
+
+class ReviewBriefSerializer(serializers.ModelSerializer):
+    """Краткие данные отзыва в комментарии"""
+    author = SlugRelatedField(slug_field='username', read_only=True)
+
+    class Meta:
+        fields = ('id', 'author', 'score')
+        model = Review
+
+
+class CommentSerializer(SparseFieldsSerializerMixin,
+                        serializers.ModelSerializer):
     """Сериализатор для комментариев"""
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
     )
+    review = ReviewBriefSerializer(read_only=True)
+
+    expandable_fields = ('review',)
 
     class Meta:
-        exclude = ('review',)
+        fields = ('id', 'text', 'author', 'pub_date', 'review')
         model = Comment
 
 
@@ -56,17 +128,40 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleStatsSerializer(serializers.ModelSerializer):
+    """Сериализатор распределения оценок произведения"""
+
+    histogram = serializers.DictField(child=serializers.IntegerField())
+    count = serializers.IntegerField()
+    median = serializers.FloatField()
+
+    class Meta:
+        fields = ('count', 'median', 'histogram')
+        model = TitleStats
+
+
+class TitleSerializer(SparseFieldsSerializerMixin,
+                      serializers.ModelSerializer):
     """Сериализатор произведений"""
 
     category = CategoryReadSerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.IntegerField(read_only=True)
+    stats = serializers.SerializerMethodField()
+
+    expandable_fields = ('stats',)
 
     class Meta:
-        fields = '__all__'
+        exclude = Title.COMPUTED_FIELDS
         model = Title
 
+    def get_stats(self, obj):
+        try:
+            stats = obj.stats
+        except TitleStats.DoesNotExist:
+            stats = TitleStats(title=obj)
+        return TitleStatsSerializer(stats).data
+
 
 class TitleCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и изменения произведений."""
@@ -79,8 +174,143 @@ class TitleCreateUpdateSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        exclude = Title.COMPUTED_FIELDS
+        model = Title
+
+
+def bulk_create_titles(titles):
+    """Сохраняет новые произведения так, чтобы у всех появился id."""
+    connection = connections[Title.objects.db]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Title.objects.bulk_create(titles)
+    elif connection.vendor == 'sqlite':
+        # SQLite не возвращает id добавленных строк. Вызов идёт внутри
+        # транзакции, которая держит блокировку записи, поэтому строки
+        # получают id подряд и заканчиваются на максимальном.
+        Title.objects.bulk_create(titles)
+        last_id = Title.objects.aggregate(Max('id'))['id__max']
+        for title_id, title in enumerate(titles, last_id - len(titles) + 1):
+            title.id = title_id
+    else:
+        for title in titles:
+            title.save()
+
+
+class TitleBulkListSerializer(serializers.ListSerializer):
+    """Создание и изменение пачки произведений.
+
+    Слаги категорий и жанров и id изменяемых произведений проверяются
+    одним запросом на модель для всей пачки. Сохранение выполняется
+    bulk-запросами и должно идти внутри транзакции.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > settings.TITLE_BULK_MAX_SIZE:
+            raise serializers.ValidationError(
+                'В одном запросе можно отправить не больше '
+                f'{settings.TITLE_BULK_MAX_SIZE} произведений.'
+            )
+        return self.resolve(super().to_internal_value(data))
+
+    def resolve(self, items):
+        """Заменяет слаги на id и проверяет, что все объекты существуют."""
+        categories = dict(Category.objects.filter(
+            slug__in={item['category'] for item in items}
+        ).values_list('slug', 'id'))
+        genres = dict(Genre.objects.filter(
+            slug__in={slug for item in items for slug in item['genre']}
+        ).values_list('slug', 'id'))
+        ids = [item['id'] for item in items if 'id' in item]
+        existing = set(Title.objects.filter(
+            id__in=ids
+        ).values_list('id', flat=True))
+
+        errors = []
+        seen = set()
+        for item in items:
+            item_errors = {}
+            if item['category'] not in categories:
+                item_errors['category'] = [
+                    f'Категория {item["category"]} не найдена.'
+                ]
+            missing = [slug for slug in item['genre'] if slug not in genres]
+            if missing:
+                item_errors['genre'] = [
+                    f'Жанр {slug} не найден.' for slug in missing
+                ]
+            if 'id' in item:
+                if item['id'] not in existing:
+                    item_errors['id'] = ['Произведение не найдено.']
+                elif item['id'] in seen:
+                    item_errors['id'] = ['Произведение повторяется.']
+                seen.add(item['id'])
+            errors.append(item_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for item in items:
+            item['category_id'] = categories[item.pop('category')]
+            item['genre'] = {genres[slug] for slug in item['genre']}
+        return items
+
+    def create(self, validated_data):
+        titles = []
+        title_genres = []
+        update_fields = {}
+        for item in validated_data:
+            item = dict(item)
+            genres = item.pop('genre')
+            title = Title(**item)
+            titles.append(title)
+            title_genres.append((title, genres))
+            if title.pk is not None:
+                fields = tuple(sorted(set(item) - {'id'}))
+                update_fields.setdefault(fields, []).append(title)
+
+        new_titles = [title for title in titles if title.pk is None]
+        if new_titles:
+            bulk_create_titles(new_titles)
+        for fields, group in update_fields.items():
+            Title.objects.bulk_update(group, fields)
+
+        through = Title.genre.through
+        links = {
+            (title.pk, genre_id)
+            for title, genres in title_genres for genre_id in genres
+        }
+        current = {
+            (title_id, genre_id): link_id
+            for link_id, title_id, genre_id in through.objects.filter(
+                title_id__in=[
+                    title.pk for group in update_fields.values()
+                    for title in group
+                ]
+            ).values_list('id', 'title_id', 'genre_id')
+        }
+        stale = [
+            link_id for link, link_id in current.items() if link not in links
+        ]
+        if stale:
+            through.objects.filter(id__in=stale).delete()
+        through.objects.bulk_create([
+            through(title_id=title_id, genre_id=genre_id)
+            for title_id, genre_id in links - current.keys()
+        ])
+        titles_bulk_saved.send(sender=Title, titles=titles)
+        return titles
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """Произведение в пачке: id есть у изменяемых, нет у новых."""
+
+    id = serializers.IntegerField(min_value=1, required=False)
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta:
+        exclude = Title.COMPUTED_FIELDS
         model = Title
+        list_serializer_class = TitleBulkListSerializer
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -128,3 +358,49 @@ class TokenSerializer(serializers.Serializer):
 
     username = UsernameCharField(required=True)
     confirmation_code = serializers.CharField(required=True)
+
+
+def load_genres(title_ids):
+    genres = {}
+    for title_id, name, slug in Title.genre.through.objects.filter(
+        title_id__in=title_ids
+    ).order_by('genre_id').values_list(
+        'title_id', 'genre__name', 'genre__slug'
+    ):
+        genres.setdefault(title_id, []).append({'name': name, 'slug': slug})
+    return genres
+
+
+def get_rating(rating_sum, rating_count):
+    return int(rating_sum / rating_count) if rating_count else None
+
+
+pub_date = serializers.DateTimeField().to_representation
+
+# Списки без сериализаторов. Поля и значения совпадают с TitleSerializer,
+# ReviewSerializer и CommentSerializer.
+TITLE_ROWS = RowMapper({
+    'id': 'id',
+    'category': Nested('category_id', {
+        'name': 'category__name',
+        'slug': 'category__slug',
+    }),
+    'genre': Prefetched('id', load_genres),
+    'rating': Column('rating_sum', 'rating_count', convert=get_rating),
+    'name': 'name',
+    'year': 'year',
+    'description': 'description',
+})
+REVIEW_ROWS = RowMapper({
+    'id': 'id',
+    'text': 'text',
+    'author': 'author__username',
+    'score': 'score',
+    'pub_date': Column('pub_date', convert=pub_date),
+})
+COMMENT_ROWS = RowMapper({
+    'id': 'id',
+    'text': 'text',
+    'author': 'author__username',
+    'pub_date': Column('pub_date', convert=pub_date),
+})
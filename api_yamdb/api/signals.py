@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import (cache_token_version, forget_token_version,
+                                user_cache)
+from api.cache import bump_versions_on_commit
+from api.pagination import get_count_version_name, invalidate_counts
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import (objects_bulk_changed, reviews_bulk_created,
+                             titles_bulk_saved)
+
+
+# Количества отзывов и комментариев кэшируются для каждого произведения
+# и отзыва, области совпадают с get_count_scope во views.
+@receiver(post_save, sender=Review)
+def invalidate_review_counts_on_create(sender, instance, created, **kwargs):
+    if created:
+        invalidate_counts(Review, f'title={instance.title_id}')
+
+
+@receiver(post_delete, sender=Review)
+def invalidate_review_counts_on_delete(sender, instance, **kwargs):
+    invalidate_counts(Review, f'title={instance.title_id}')
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_comment_counts_on_create(sender, instance, created,
+                                        **kwargs):
+    if created:
+        invalidate_counts(Comment, f'review={instance.review_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_counts_on_delete(sender, instance, **kwargs):
+    invalidate_counts(Comment, f'review={instance.review_id}')
+
+
+# Изменение произведения, его жанров и удаление категорий и жанров
+# меняют результат фильтров списка произведений.
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def invalidate_title_counts(sender, **kwargs):
+    invalidate_counts(Title)
+
+
+def invalidate_responses(*names):
+    """Сбрасывает кэш ответов после фиксации транзакции."""
+    bump_versions_on_commit(*names)
+
+
+# Категории и жанры вложены в ответы о произведениях.
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, **kwargs):
+    invalidate_responses('categories', 'titles')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_responses(sender, **kwargs):
+    invalidate_responses('genres', 'titles')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def invalidate_title_responses(sender, instance, **kwargs):
+    invalidate_responses('titles:list', f'titles:{instance.pk}')
+
+
+@receiver(titles_bulk_saved, sender=Title)
+def invalidate_bulk_title_responses(sender, titles, **kwargs):
+    invalidate_counts(Title)
+    invalidate_responses(
+        'titles:list', *(f'titles:{title.pk}' for title in titles)
+    )
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genre_responses(sender, instance, reverse, action,
+                                     **kwargs):
+    if not action.startswith('post_'):
+        return
+    invalidate_counts(Title)
+    if reverse:
+        invalidate_responses('titles')
+    else:
+        invalidate_responses('titles:list', f'titles:{instance.pk}')
+
+
+# От отзывов зависит рейтинг произведения.
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_responses(sender, instance, **kwargs):
+    invalidate_responses(
+        'titles:list',
+        f'titles:{instance.title_id}',
+        f'reviews:{instance.title_id}',
+    )
+
+
+@receiver(reviews_bulk_created, sender=Review)
+def invalidate_bulk_review_responses(sender, reviews, **kwargs):
+    title_ids = {review.title_id for review in reviews}
+    invalidate_counts(Review, *(f'title={title_id}' for title_id in title_ids))
+    invalidate_responses(
+        'titles:list',
+        *(f'titles:{title_id}' for title_id in title_ids),
+        *(f'reviews:{title_id}' for title_id in title_ids),
+    )
+
+
+# Версии, которые сбрасываются при изменении объектов модели командами.
+BULK_CHANGED_VERSIONS = {
+    Category: ('categories', 'titles', get_count_version_name(Title)),
+    Genre: ('genres', 'titles', get_count_version_name(Title)),
+    Title: ('titles', get_count_version_name(Title)),
+    Review: ('titles', 'reviews', get_count_version_name(Review)),
+    Comment: ('comments', get_count_version_name(Comment)),
+    User: ('users', 'usernames'),
+}
+
+
+@receiver(objects_bulk_changed)
+def invalidate_bulk_changed_responses(sender, **kwargs):
+    invalidate_responses(*BULK_CHANGED_VERSIONS[sender])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    invalidate_responses(f'comments:{instance.review_id}')
+
+
+# Имя автора выводится в отзывах и комментариях.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, created=False, **kwargs):
+    if created:
+        invalidate_responses('users')
+    else:
+        invalidate_responses('users', 'usernames')
+
+
+@receiver(post_save, sender=User)
+def update_token_version(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    transaction.on_commit(lambda: cache_token_version(instance))
+
+
+@receiver(post_delete, sender=User)
+def delete_token_version(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    transaction.on_commit(lambda: forget_token_version(instance.pk))
@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                       ReviewViewSet, SignupView, TitleViewSet, TokenView,
-                       UserViewSet)
+                       ReviewBatchView, ReviewViewSet, SignupView,
+                       TitleViewSet, TokenView, UserViewSet)
 
 router_v1 = DefaultRouter()
 
@@ -29,6 +29,9 @@ auth_urls = [
 ]
 
 urlpatterns = [
+    path(
+        'v1/reviews/batch/', ReviewBatchView.as_view(), name='reviews-batch'
+    ),
     path('v1/', include(router_v1.urls)),
     path('v1/auth/', include(auth_urls)),
 ]
@@ -3,11 +3,13 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import filters, mixins, serializers, viewsets
 from rest_framework.pagination import PageNumberPagination
 
+from api.cache import CachedResponseMixin
 from api.permissions import IsAdministratorOrReadOnly
 from reviews.validators import username_validator
 
 
 class GenreCategoryBaseViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -21,6 +23,57 @@ class GenreCategoryBaseViewSet(
     lookup_field = 'slug'
 
 
+def get_query_list(request, param):
+    """Значения параметра запроса, перечисленные через запятую."""
+    if request is None:
+        return set()
+    return {
+        value for value in request.query_params.get(param, '').split(',')
+        if value
+    }
+
+
+def get_expanded(request):
+    """Поля, запрошенные параметром expand или его синонимом include."""
+    return get_query_list(request, 'expand') | get_query_list(
+        request, 'include'
+    )
+
+
+class SparseFieldsViewMixin:
+    """Загружает из базы только поля, которые попадут в ответ на GET.
+
+    Поля ответа берутся из сериализатора, который учитывает параметры
+    fields и expand. field_sources задаёт пути полей модели для полей
+    ответа, имя которых не совпадает с полем модели; для связанных
+    моделей добавляется select_related. field_prefetches задаёт связи,
+    которые загружаются через prefetch_related. ordering_fields
+    загружаются всегда, они нужны для курсора пагинации.
+    """
+
+    field_sources = {}
+    field_prefetches = {}
+    ordering_fields = ()
+
+    def prune_queryset(self, queryset):
+        if self.request.method != 'GET':
+            return queryset
+        only = set(self.ordering_fields)
+        related = set()
+        prefetch = set()
+        for name in self.get_serializer().fields:
+            if name in self.field_prefetches:
+                prefetch.add(self.field_prefetches[name])
+                continue
+            for path in self.field_sources.get(name, (name,)):
+                only.add(path)
+                if '__' in path:
+                    related.add(path.rsplit('__', 1)[0])
+        return queryset.select_related(*related).prefetch_related(
+            *prefetch
+        ).only(*only)
+
+
 class UsernameCharField(serializers.CharField):
     def __init__(self, **kwargs):
         kwargs['max_length'] = kwargs.get(
@@ -1,60 +1,235 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import AccessToken
 
+from api.authentication import get_access_token, load_user
+from api.cache import (CachedDetailResponseMixin, ConditionalDetailGetMixin,
+                       ConditionalGetMixin)
 from api.filters import FilterByTitle
+from api.pagination import (KeysetPagination, OptionalKeysetPagination,
+                            TitlePagination)
 from api.permissions import (IsAdmin, IsAdministratorOrReadOnly,
                              IsAuthorModeratorAdminOrReadOnly)
-from api.serializers import (CategoryReadSerializer, CommentSerializer,
-                             GenreSerializer, MeSerializer, ReviewSerializer,
-                             SignupSerializer, TitleCreateUpdateSerializer,
-                             TitleSerializer, TokenSerializer, UserSerializer)
-from api.utils import GenreCategoryBaseViewSet
-from reviews.models import Category, Genre, Review, Title
+from api.rows import RowMapperListMixin
+from api.serializers import (COMMENT_ROWS, GENRES, REVIEW_ROWS, TITLE_ROWS,
+                             CategoryReadSerializer, CommentSerializer,
+                             GenreSerializer, MeSerializer,
+                             ReviewBatchItemSerializer, ReviewSerializer,
+                             SignupSerializer, TitleBulkSerializer,
+                             TitleCreateUpdateSerializer, TitleSerializer,
+                             TokenSerializer, UserSerializer)
+from api.utils import (GenreCategoryBaseViewSet, SparseFieldsViewMixin,
+                       get_expanded)
+from mailqueue.queue import send_mail
+from reviews.models import Category, Genre, Review, Title, TitleStats
+from reviews.signals import reviews_bulk_created
 
 User = get_user_model()
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ConditionalDetailGetMixin,
+    SparseFieldsViewMixin,
+    RowMapperListMixin,
+    viewsets.ModelViewSet
+):
     """Отзывы"""
 
     serializer_class = ReviewSerializer
+    row_mapper = REVIEW_ROWS
+    pagination_class = OptionalKeysetPagination
+    field_sources = {
+        'author': ('author__username',),
+        'title': ('title__name', 'title__year'),
+    }
+    ordering_fields = ('pub_date', 'id')
     permission_classes = (
         IsAuthorModeratorAdminOrReadOnly,
         IsAuthenticatedOrReadOnly
     )
     http_method_names = ('get', 'post', 'patch', 'delete')
+    query_budget = {
+        'list': 9,
+        'retrieve': 4,
+        'create': 10,
+        'partial_update': 8,
+        'destroy': 9,
+    }
+
+    def get_cache_versions(self):
+        title_id = self.kwargs.get('title_id')
+        versions = ('reviews', f'reviews:{title_id}', 'usernames')
+        if 'title' in get_expanded(self.request):
+            versions += ('titles', f'titles:{title_id}')
+        return versions
+
+    def get_count_scope(self):
+        return f'title={self.kwargs.get("title_id")}'
 
     def get_title(self):
         return get_object_or_404(Title, id=self.kwargs.get('title_id'))
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.prune_queryset(self.get_title().reviews.all())
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class ReviewBatchView(APIView):
+    """Пакетная загрузка отзывов к разным произведениям.
+
+    Принимает список отзывов и возвращает результат для каждого из них
+    в том же порядке. Произведения и повторные отзывы проверяются
+    общими запросами для всей пачки, отзывы сохраняются bulk_create.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    query_budget = {'post': 13}
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Ожидается непустой список отзывов.')
+        if len(items) > settings.REVIEW_BATCH_MAX_SIZE:
+            raise ValidationError(
+                'В одном запросе можно отправить не больше '
+                f'{settings.REVIEW_BATCH_MAX_SIZE} отзывов.'
+            )
+        results = [None] * len(items)
+        valid = {}
+        for position, item in enumerate(items):
+            serializer = ReviewBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                valid[position] = serializer.validated_data
+            else:
+                results[position] = self.error(serializer.errors)
+
+        try:
+            with transaction.atomic():
+                reviews = self.create_reviews(request.user, valid, results)
+        except IntegrityError:
+            return Response(
+                {'detail': 'Отзывы изменились во время загрузки, '
+                           'повторите запрос.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        for position, review in reviews.items():
+            results[position] = {
+                'status': status.HTTP_201_CREATED,
+                'title': review.title_id,
+                'review': ReviewSerializer(review).data,
+            }
+        if len(reviews) == len(items):
+            return Response(results, status=status.HTTP_201_CREATED)
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
+    @staticmethod
+    def error(errors, code=status.HTTP_400_BAD_REQUEST):
+        return {'status': code, 'errors': errors}
+
+    def create_reviews(self, author, valid, results):
+        """Проверяет отзывы из valid и сохраняет подходящие.
+
+        Ошибки записываются в results, возвращаются созданные отзывы
+        по их позициям в запросе.
+        """
+        title_ids = {data['title'] for data in valid.values()}
+        if not title_ids:
+            return {}
+        titles = set(Title.objects.filter(
+            id__in=title_ids
+        ).values_list('id', flat=True))
+        reviewed = set(Review.objects.filter(
+            author=author, title_id__in=titles
+        ).values_list('title_id', flat=True))
+        reviews = {}
+        for position, data in valid.items():
+            title_id = data['title']
+            if title_id not in titles:
+                results[position] = self.error(
+                    {'title': ['Произведение не найдено.']},
+                    status.HTTP_404_NOT_FOUND
+                )
+            elif title_id in reviewed:
+                results[position] = self.error({'non_field_errors': [
+                    'Вы уже писали отзыв к этому произведению.'
+                ]})
+            else:
+                reviewed.add(title_id)
+                reviews[position] = Review(
+                    author=author,
+                    title_id=title_id,
+                    text=data['text'],
+                    score=data['score'],
+                )
+        if not reviews:
+            return reviews
+
+        created = Review.objects.bulk_create(reviews.values())
+        if created[0].pk is None:
+            # Не все СУБД возвращают id строк, добавленных bulk_create.
+            ids = dict(Review.objects.filter(
+                author=author, title_id__in=[r.title_id for r in created]
+            ).values_list('title_id', 'id'))
+            for review in created:
+                review.pk = ids[review.title_id]
+        reviews_bulk_created.send(sender=Review, reviews=created)
+        return reviews
+
+
+class CommentViewSet(
+    ConditionalDetailGetMixin,
+    SparseFieldsViewMixin,
+    RowMapperListMixin,
+    viewsets.ModelViewSet
+):
     """Комментарии"""
 
     serializer_class = CommentSerializer
+    row_mapper = COMMENT_ROWS
+    pagination_class = OptionalKeysetPagination
+    field_sources = {
+        'author': ('author__username',),
+        'review': ('review__score', 'review__author__username'),
+    }
+    ordering_fields = ('pub_date', 'id')
     permission_classes = (
         IsAuthorModeratorAdminOrReadOnly,
         IsAuthenticatedOrReadOnly
     )
     http_method_names = ('get', 'post', 'patch', 'delete')
+    query_budget = {
+        'list': 9,
+        'retrieve': 4,
+        'create': 4,
+        'partial_update': 5,
+        'destroy': 6,
+    }
+
+    def get_cache_versions(self):
+        versions = (
+            'comments',
+            f'comments:{self.kwargs.get("review_id")}',
+            'usernames',
+        )
+        if 'review' in get_expanded(self.request):
+            title_id = self.kwargs.get('title_id')
+            versions += ('reviews', f'reviews:{title_id}')
+        return versions
+
+    def get_count_scope(self):
+        return f'review={self.kwargs.get("review_id")}'
 
     def get_review(self):
         return get_object_or_404(
@@ -64,52 +239,143 @@ class CommentViewSet(viewsets.ModelViewSet):
         )
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.prune_queryset(self.get_review().comments.all())
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, review=self.get_review())
 
 
-class CategoryViewSet(GenreCategoryBaseViewSet):
+class CategoryViewSet(ConditionalGetMixin, GenreCategoryBaseViewSet):
     """Категории произведений"""
 
     queryset = Category.objects.all()
     serializer_class = CategoryReadSerializer
+    cache_namespace = 'categories'
+    query_budget = {'list': 3, 'create': 4, 'destroy': 5}
 
 
-class GenreViewSet(GenreCategoryBaseViewSet):
+class GenreViewSet(ConditionalGetMixin, GenreCategoryBaseViewSet):
     """Жанры произведений"""
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_namespace = 'genres'
+    query_budget = {'list': 3, 'create': 4, 'destroy': 5}
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ConditionalDetailGetMixin,
+    CachedDetailResponseMixin,
+    SparseFieldsViewMixin,
+    RowMapperListMixin,
+    viewsets.ModelViewSet
+):
     """Произведения"""
 
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('name')
+    queryset = Title.objects.order_by('name', 'id')
+    row_mapper = TITLE_ROWS
+    field_sources = {
+        'rating': ('rating_sum', 'rating_count'),
+        'category': ('category__name', 'category__slug'),
+        'stats': tuple(
+            f'stats__{TitleStats.score_field(score)}'
+            for score in TitleStats.SCORES
+        ),
+    }
+    field_prefetches = {'genre': GENRES}
+    ordering_fields = ('name', 'id', 'weighted_rating', 'trending_score')
+    pagination_class = TitlePagination
+    cache_namespace = 'titles'
     permission_classes = (IsAdministratorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = FilterByTitle
     http_method_names = ('get', 'post', 'patch', 'delete')
+    query_budget = {
+        'list': 5,
+        'retrieve': 3,
+        'create': 14,
+        'partial_update': 13,
+        'destroy': 11,
+        'bulk': 14,
+        'top': 3,
+        'trending': 3,
+    }
+    read_actions = ('list', 'retrieve', 'top', 'trending')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'bulk':
+            return queryset.select_related(
+                'category'
+            ).prefetch_related(GENRES)
+        return self.prune_queryset(queryset)
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in self.read_actions:
             return TitleSerializer
+        if self.action == 'bulk':
+            return TitleBulkSerializer
         return TitleCreateUpdateSerializer
 
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        """Создание и изменение пачки произведений в одной транзакции."""
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            titles = serializer.save()
+        saved = self.get_queryset().in_bulk([title.pk for title in titles])
+        return Response(
+            TitleSerializer(
+                [saved[title.pk] for title in titles], many=True
+            ).data,
+            status=status.HTTP_200_OK
+        )
+
+    def get_ranking(self, ordering):
+        """Страница произведений, отсортированных по индексу ordering."""
+        paginator = KeysetPagination()
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(
+            self.filter_queryset(self.get_queryset()), self.request, self
+        )
+        return paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    @action(methods=['GET'], detail=False)
+    def top(self, request):
+        """Произведения по убыванию взвешенного рейтинга."""
 
-class UserViewSet(viewsets.ModelViewSet):
+        return self.get_ranking(('-weighted_rating', '-id'))
+
+    @action(methods=['GET'], detail=False)
+    def trending(self, request):
+        """Произведения по количеству отзывов за TRENDING_WINDOW."""
+
+        return self.get_ranking(('-trending_score', '-id'))
+
+
+class UserViewSet(ConditionalDetailGetMixin, viewsets.ModelViewSet):
     """Работа с пользователями"""
 
     lookup_field = 'username'
+    cache_namespace = 'users'
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAdmin,)
     http_method_names = ('get', 'post', 'patch', 'delete')
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
+    query_budget = {
+        'list': 4,
+        'retrieve': 3,
+        'create': 5,
+        'partial_update': 4,
+        'destroy': 16,
+        'me': 3,
+    }
 
     @action(
         methods=['GET', 'PATCH'],
@@ -119,13 +385,12 @@ class UserViewSet(viewsets.ModelViewSet):
     def me(self, request):
         """Метод редактирования при запросе на users/me/"""
 
+        user = load_user(request.user)
         if request.method == 'GET':
-            serializer = UserSerializer(request.user)
+            serializer = UserSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
-        serializer = MeSerializer(
-            request.user, data=request.data, partial=True
-        )
+        serializer = MeSerializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -135,6 +400,7 @@ class SignupView(APIView):
     """Создание пользователя и отправка кода подтверждения."""
 
     permission_classes = (AllowAny,)
+    query_budget = {'post': 8}
 
     def post(self, request):
         serializer = SignupSerializer(data=request.data)
@@ -148,7 +414,6 @@ class SignupView(APIView):
             f'Код для регистрации: {confirmation_code}',
             settings.EMAIL,
             [f'{user.email}'],
-            fail_silently=False,
         )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -157,6 +422,7 @@ class TokenView(APIView):
     """Получение JWT токена."""
 
     permission_classes = (AllowAny,)
+    query_budget = {'post': 1}
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
@@ -168,5 +434,5 @@ class TokenView(APIView):
         if not default_token_generator.check_token(user, confirmation_code):
             message = 'Неверный код подтверждения'
             return Response(message, status=status.HTTP_400_BAD_REQUEST)
-        message = {'token': str(AccessToken.for_user(user))}
+        message = {'token': str(get_access_token(user))}
         return Response(message, status=status.HTTP_200_OK)
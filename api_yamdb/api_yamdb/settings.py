@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django_filters',
     'reviews.apps.ReviewsConfig',
     'api.apps.ApiConfig',
+    'mailqueue.apps.MailQueueConfig',
 ]
 
 MIDDLEWARE = [
@@ -47,6 +48,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryCountMiddleware',
+    'api.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -80,6 +83,49 @@ DATABASES = {
     }
 }
 
+# Реплики основной базы только для чтения, например копии db.sqlite3:
+# DB_REPLICAS=replica1.sqlite3,replica2.sqlite3.
+DATABASES.update({
+    f'replica{number}': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    for number, name in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1
+    )
+})
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+# Сколько секунд после запроса на запись чтения пользователя, а после
+# изменения данных — чтения кэшируемых ответов с этими данными идут
+# в основную базу. Должно быть больше задержки репликации.
+REPLICA_PIN_TIMEOUT = 5
+
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Время жизни закэшированных ответов API, секунды.
+RESPONSE_CACHE_TIMEOUT = 300
+# Сколько секунд процесс использует прочитанные из базы версии данных
+# кэша: изменения из других процессов видны не позже этого времени.
+CACHE_VERSION_TIMEOUT = 2
+
+# Кэш пользователей в памяти процесса для аутентификации по JWT:
+# количество пользователей и время жизни записи в секундах. Столько же
+# хранятся версии токенов пользователей в кэше default.
+USER_CACHE_SIZE = 1024
+USER_CACHE_TIMEOUT = 60
+
 
 # Password validation
 
@@ -122,7 +168,17 @@ AUTH_USER_MODEL = 'reviews.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
+    ],
+    # Браузерный интерфейс API доступен только в режиме DEBUG.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': ('rest_framework.pagination.PageNumberPagination'),
     'PAGE_SIZE': 5,
@@ -136,6 +192,25 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Время жизни закэшированного количества объектов в списках, секунды.
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+# Списки длиннее этого значения показывают оценку количества объектов.
+PAGINATION_EXACT_COUNT_LIMIT = 100000
+
+# Максимальное количество отзывов в одном запросе к /reviews/batch/.
+REVIEW_BATCH_MAX_SIZE = 500
+# Максимальное количество произведений в одном запросе к /titles/bulk/.
+TITLE_BULK_MAX_SIZE = 1000
+
+# Вес средней оценки во взвешенном рейтинге /titles/top/: столько
+# отзывов со средней оценкой добавляется к отзывам каждого произведения.
+TITLE_RATING_PRIOR_WEIGHT = 10
+# Сколько секунд процесс использует среднюю оценку из базы: после
+# refresh_rankings другие процессы перейдут на новую не позже.
+MEAN_SCORE_CACHE_TIMEOUT = 60
+# Отзывы за этот период учитываются в /titles/trending/.
+TRENDING_WINDOW = timedelta(days=7)
+
 DEFAULT_ROLE = 'user'
 MAX_LENGTH_NAME = 256
 MAX_LENGTH_SLUG = 50
@@ -149,3 +224,13 @@ EMAIL_USE_TLS = False
 EMAIL_USE_SSL = True
 EMAIL_HOST_USER = os.getenv('EMAIL')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_PASS')
+
+# Очередь писем: OutboxMailQueue сохраняет письма в базу, их отправляет
+# команда send_queued_mail; ImmediateMailQueue отправляет письмо сразу.
+MAIL_QUEUE_BACKEND = 'mailqueue.queue.OutboxMailQueue'
+# Отправлять письмо сразу после сохранения в очередь.
+MAIL_QUEUE_EAGER = False
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+# Задержка перед повторной отправкой, секунды; удваивается с каждой
+# попыткой.
+MAIL_QUEUE_RETRY_DELAY = 60
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from mailqueue.models import OutgoingEmail
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at')
+    # Текст письма содержит код подтверждения.
+    exclude = ('body',)
+    list_filter = ('status',)
+    search_fields = ('to',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
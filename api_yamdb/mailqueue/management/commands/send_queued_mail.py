@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailqueue.queue import send_queued
+
+
+class Command(BaseCommand):
+    """Отправляет письма из очереди OutgoingEmail"""
+
+    help = 'Отправляет письма из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Количество писем, отправляемых через одно соединение',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval с',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между проверками пустой очереди, секунды',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, с ошибкой: {failed}'
+                )
+            if not options['loop']:
+                break
+            if not sent and not failed:
+                time.sleep(options['interval'])
@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку"""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('тема', max_length=255)
+    body = models.TextField('текст')
+    from_email = models.CharField('отправитель', max_length=254, blank=True)
+    to = models.TextField('получатели')
+    status = models.CharField(
+        'статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('попытки', default=0)
+    next_attempt_at = models.DateTimeField(
+        'следующая попытка',
+        default=timezone.now,
+    )
+    last_error = models.TextField('последняя ошибка', blank=True)
+    created_at = models.DateTimeField('создано', auto_now_add=True)
+    sent_at = models.DateTimeField('отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('next_attempt_at',)
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='outgoing_email_due_idx'
+            )
+        ]
+
+    def __str__(self):
+        return self.subject
+
+    @property
+    def recipients(self):
+        return self.to.split(',')
@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from mailqueue.models import OutgoingEmail
+
+
+class ImmediateMailQueue:
+    """Отправляет письмо сразу, в том же запросе."""
+
+    def enqueue(self, subject, message, from_email, recipient_list):
+        mail.send_mail(
+            subject, message, from_email, recipient_list,
+            fail_silently=False,
+        )
+
+
+class OutboxMailQueue:
+    """Сохраняет письмо в таблицу OutgoingEmail.
+
+    Письма отправляет команда send_queued_mail. При MAIL_QUEUE_EAGER
+    письмо отправляется сразу после фиксации транзакции, что удобно
+    в тестах.
+    """
+
+    def enqueue(self, subject, message, from_email, recipient_list):
+        email = OutgoingEmail.objects.create(
+            subject=subject,
+            body=message,
+            from_email=from_email or '',
+            to=','.join(recipient_list),
+        )
+        if settings.MAIL_QUEUE_EAGER:
+            transaction.on_commit(lambda: deliver([email]))
+        return email
+
+
+def get_mail_queue():
+    return import_string(settings.MAIL_QUEUE_BACKEND)()
+
+
+def send_mail(subject, message, from_email, recipient_list):
+    """Ставит письмо в очередь, заданную MAIL_QUEUE_BACKEND."""
+    return get_mail_queue().enqueue(
+        subject, message, from_email, recipient_list
+    )
+
+
+def get_retry_delay(attempts):
+    """Задержка перед следующей попыткой растёт экспоненциально."""
+    return timedelta(
+        seconds=settings.MAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def claim_due(batch_size):
+    """Забирает письма, которые пора отправить.
+
+    Время следующей попытки у забранных писем сдвигается, чтобы другой
+    обработчик очереди не отправил их повторно.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING, next_attempt_at__lte=now
+        )
+        if connections[due.db].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        emails = list(due[:batch_size])
+        OutgoingEmail.objects.filter(
+            id__in=[email.id for email in emails]
+        ).update(next_attempt_at=now + get_retry_delay(1))
+    return emails
+
+
+def send_queued(batch_size=100):
+    """Отправляет одну пачку писем, которые пора отправить."""
+    return deliver(claim_due(batch_size))
+
+
+def deliver(emails):
+    """Отправляет письма через одно SMTP соединение.
+
+    Текст отправленного письма удаляется: в нём код подтверждения,
+    который можно обменять на токен.
+    Возвращает количество отправленных и неотправленных писем.
+    """
+    if not emails:
+        return 0, 0
+    connection = mail.get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            mark_failed(email, error)
+        return 0, len(emails)
+    sent = failed = 0
+    try:
+        for email in emails:
+            try:
+                mail.EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email or None,
+                    email.recipients,
+                    connection=connection,
+                ).send()
+            except Exception as error:
+                failed += 1
+                mark_failed(email, error)
+            else:
+                sent += 1
+                email.status = OutgoingEmail.SENT
+                email.sent_at = timezone.now()
+                email.body = ''
+                email.save(update_fields=('status', 'sent_at', 'body'))
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = repr(error)
+    if email.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+        email.body = ''
+    else:
+        email.next_attempt_at = timezone.now() + get_retry_delay(
+            email.attempts
+        )
+    email.save(update_fields=(
+        'attempts', 'last_error', 'status', 'next_attempt_at', 'body'
+    ))
@@ -0,0 +1,298 @@
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import objects_bulk_changed
+
+DEFAULT_BATCH_SIZE = 50000
+DEFAULT_ZIPF = 1.1
+WORDS = (
+    'тёмный', 'город', 'последний', 'день', 'война', 'мир', 'любовь',
+    'ночь', 'дорога', 'дом', 'тайна', 'остров', 'звезда', 'море', 'время',
+    'зима', 'лето', 'песня', 'история', 'король', 'сердце', 'тень',
+    'огонь', 'ветер', 'река', 'небо', 'путь', 'сон', 'память', 'голос',
+)
+
+
+def zipf_weights(count, exponent):
+    """Веса рангов 1..count в распределении Ципфа."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def zipf_rank(rng, count, exponent):
+    """Случайный ранг от 0 до count - 1 с распределением Ципфа.
+
+    Ранг вычисляется обращением функции распределения непрерывного
+    аналога, поэтому не требует памяти под веса всех рангов.
+    """
+    u = rng.random()
+    if exponent == 1:
+        value = (count + 1) ** u
+    else:
+        power = 1 - exponent
+        value = (1 + u * ((count + 1) ** power - 1)) ** (1 / power)
+    return min(int(value) - 1, count - 1)
+
+
+def split_by_weights(total, weights, limit):
+    """Делит total на части пропорционально весам, не больше limit."""
+    scale = total / sum(weights)
+    counts = [min(int(weight * scale), limit) for weight in weights]
+    left = total - sum(counts)
+    while left:
+        for position, count in enumerate(counts):
+            if count < limit:
+                counts[position] += 1
+                left -= 1
+                if not left:
+                    break
+    return counts
+
+
+def get_text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def get_next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    """Заполняет базу данных сгенерированными данными"""
+
+    help = (
+        'Создаёт пользователей, категории, жанры, произведения, отзывы и '
+        'комментарии. Количество отзывов по произведениям и комментариев '
+        'по отзывам распределено по закону Ципфа; при одинаковом --seed '
+        'создаются одни и те же данные, даты отсчитываются от запуска.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ('users', 1000),
+            ('categories', 10),
+            ('genres', 30),
+            ('titles', 10000),
+            ('reviews', 100000),
+            ('comments', 100000),
+        ):
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Количество создаваемых объектов ({name})',
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора случайных чисел',
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=DEFAULT_ZIPF,
+            help='Показатель распределения Ципфа',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней создаются отзывы и комментарии',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество строк в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        if options['reviews'] > options['titles'] * options['users']:
+            raise CommandError(
+                'Каждый пользователь может оставить к произведению только '
+                'один отзыв: --reviews не больше --titles * --users.'
+            )
+        if options['comments'] and not (
+            options['reviews'] and options['users']
+        ):
+            raise CommandError(
+                'Для комментариев нужны --reviews и --users больше нуля.'
+            )
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.zipf = options['zipf']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+        self.adapt_datetime = connections[
+            router.db_for_write(Review)
+        ].ops.adapt_datetimefield_value
+
+        users = self.generate_users(options['users'])
+        categories = self.generate_named(Category, options['categories'])
+        genres = self.generate_named(Genre, options['genres'])
+        titles = self.generate_titles(options['titles'], categories, genres)
+        reviews = self.generate_reviews(options['reviews'], titles, users)
+        self.generate_comments(options['comments'], reviews, users)
+
+        # Вставка не отправляет сигналы, поэтому рейтинг и статистика
+        # оценок произведений пересчитываются после загрузки отзывов.
+        call_command('rebuild_ratings', stdout=self.stdout)
+        call_command('rebuild_title_stats', stdout=self.stdout)
+        call_command('refresh_rankings', stdout=self.stdout)
+
+    def insert(self, model, columns, rows):
+        """Вставляет кортежи значений колонок частями по batch_size.
+
+        Каждая часть вставляется одним executemany в своей транзакции:
+        без создания объектов моделей и подготовки значений, как в
+        bulk_create, вставка идёт в несколько раз быстрее. Значения должны
+        быть в формате базы данных; остальные колонки, кроме первичного
+        ключа, получают значения по умолчанию из модели.
+        """
+        using = router.db_for_write(model)
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        fields = [
+            field for field in model._meta.concrete_fields
+            if field.column not in columns and not field.primary_key
+        ]
+        defaults = tuple(
+            field.get_db_prep_save(field.get_default(), connection)
+            for field in fields
+        )
+        columns = (*columns, *(field.column for field in fields))
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        count = 0
+        started = time.monotonic()
+        rows = (row + defaults for row in rows)
+        chunk = list(islice(rows, self.batch_size))
+        while chunk:
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, chunk)
+            count += len(chunk)
+            chunk = list(islice(rows, self.batch_size))
+        # Для промежуточной таблицы жанров auto_created — модель Title.
+        objects_bulk_changed.send(sender=model._meta.auto_created or model)
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f'{model._meta.db_table}: создано строк {count} '
+            f'({rate:.0f} строк/с)'
+        )
+
+    def get_pub_date(self):
+        return self.adapt_datetime(
+            self.now - timedelta(seconds=self.rng.random() * self.period)
+        )
+
+    def generate_users(self, count):
+        first = get_next_id(User)
+        ids = range(first, first + count)
+        password = make_password(None)
+        self.insert(User, ('id', 'username', 'email', 'password'), (
+            (pk, f'user{pk}', f'user{pk}@yamdb.fake', password)
+            for pk in ids
+        ))
+        return ids
+
+    def generate_named(self, model, count):
+        first = get_next_id(model)
+        ids = range(first, first + count)
+        name = model._meta.model_name
+        self.insert(model, ('id', 'name', 'slug'), (
+            (pk, f'{name} {pk}'.capitalize(), f'{name}-{pk}')
+            for pk in ids
+        ))
+        return ids
+
+    def generate_titles(self, count, categories, genres):
+        rng = self.rng
+        first = get_next_id(Title)
+        ids = range(first, first + count)
+        year = self.now.year
+        self.insert(Title, (
+            'id', 'name', 'year', 'category_id', 'description'
+        ), (
+            (
+                pk,
+                get_text(rng, 1, 4),
+                rng.randint(1900, year),
+                rng.choice(categories) if categories else None,
+                get_text(rng, 0, 30),
+            )
+            for pk in ids
+        ))
+        if genres:
+            self.insert(Title.genre.through, ('title_id', 'genre_id'), (
+                (pk, genre_id)
+                for pk in ids
+                for genre_id in rng.sample(genres, min(
+                    rng.randint(1, 3), len(genres)
+                ))
+            ))
+        return ids
+
+    def generate_reviews(self, count, titles, users):
+        """Создаёт отзывы к произведениям в случайном порядке популярности.
+
+        Количество отзывов к произведению убывает с его рангом по закону
+        Ципфа, авторы отзывов к одному произведению не повторяются.
+        """
+        rng = self.rng
+        first = get_next_id(Review)
+        ranked = list(titles)
+        rng.shuffle(ranked)
+        counts = split_by_weights(
+            count, zipf_weights(len(ranked), self.zipf), len(users)
+        ) if count else []
+
+        def reviews():
+            pk = first
+            for title_id, title_count in zip(ranked, counts):
+                quality = rng.uniform(3, 9)
+                for author in rng.sample(users, title_count):
+                    yield (
+                        pk,
+                        title_id,
+                        author,
+                        get_text(rng, 5, 40),
+                        min(max(round(rng.gauss(quality, 2)), 1), 10),
+                        self.get_pub_date(),
+                    )
+                    pk += 1
+
+        self.insert(Review, (
+            'id', 'title_id', 'author_id', 'text', 'score', 'pub_date'
+        ), reviews())
+        return range(first, first + count)
+
+    def generate_comments(self, count, reviews, users):
+        rng = self.rng
+        first = get_next_id(Comment)
+        self.insert(Comment, (
+            'id', 'review_id', 'author_id', 'text', 'pub_date'
+        ), (
+            (
+                pk,
+                reviews[zipf_rank(rng, len(reviews), self.zipf)],
+                rng.choice(users),
+                get_text(rng, 3, 20),
+                self.get_pub_date(),
+            )
+            for pk in range(first, first + count)
+        ))
@@ -1,75 +1,212 @@
-import csv
-
-from django.core.management.base import BaseCommand
-
-from reviews.models import Category, Comment, Genre, Review, Title, User
-
-path = 'static/data/'
-
-
-class Command(BaseCommand):
-    """Заполняет базу данных из csv файлов"""
-
-    help = 'Заполняет базу данных данными из файлов'
-
-    def handle(self, *args, **options):
-
-        # User
-        with open(f'{path}users.csv', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                user = User(**row)
-                user.save()
-
-        # Category
-        with open(f'{path}category.csv', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                category = Category(**row)
-                category.save()
-
-        # Genre
-        with open(f'{path}genre.csv', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                genre = Genre(**row)
-                genre.save()
-
-        # Title
-        with open(f'{path}titles.csv', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                title = Title(
-                    id=row['id'],
-                    name=row['name'],
-                    year=row['year'],
-                    category=Category.objects.get(id=row['category']),
-                )
-                title.save()
-
-        # Review
-        with open(f'{path}review.csv', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                review = Review(
-                    id=row['id'],
-                    title=Title.objects.get(id=row['title_id']),
-                    text=row['text'],
-                    author=User.objects.get(id=row['author']),
-                    score=row['score'],
-                    pub_date=row['pub_date'],
-                )
-                review.save()
-
-        # Comment
-        with open(f'{path}comments.csv', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                comment = Comment(
-                    id=row['id'],
-                    review=Review.objects.get(id=row['review_id']),
-                    text=row['text'],
-                    author=User.objects.get(id=row['author']),
-                    pub_date=row['pub_date']
-                )
-                comment.save()
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from graphlib import TopologicalSorter
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import objects_bulk_changed
+
+DEFAULT_PATH = settings.BASE_DIR / 'static/data/'
+DEFAULT_BATCH_SIZE = 1000
+STATE_FILENAME = '.import_csv_state.json'
+MAX_ERRORS = 10
+INTEGER_FIELDS = ('id', 'year', 'score')
+
+
+def title_fields(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'year': row['year'],
+        'category_id': row['category'],
+    }
+
+
+def review_fields(row):
+    return {
+        'id': row['id'],
+        'title_id': row['title_id'],
+        'text': row['text'],
+        'author_id': row['author'],
+        'score': row['score'],
+        'pub_date': row['pub_date'],
+    }
+
+
+def comment_fields(row):
+    return {
+        'id': row['id'],
+        'review_id': row['review_id'],
+        'text': row['text'],
+        'author_id': row['author'],
+        'pub_date': row['pub_date'],
+    }
+
+
+# Файл: (модель, преобразование строки, файлы, от которых он зависит).
+FILES = {
+    'users.csv': (User, dict, ()),
+    'category.csv': (Category, dict, ()),
+    'genre.csv': (Genre, dict, ()),
+    'titles.csv': (Title, title_fields, ('category.csv',)),
+    'genre_title.csv': (
+        Title.genre.through, dict, ('titles.csv', 'genre.csv')
+    ),
+    'review.csv': (Review, review_fields, ('titles.csv', 'users.csv')),
+    'comments.csv': (Comment, comment_fields, ('review.csv', 'users.csv')),
+}
+
+
+def load_order():
+    """Порядок загрузки файлов с учётом внешних ключей."""
+    return tuple(TopologicalSorter(
+        {filename: spec[2] for filename, spec in FILES.items()}
+    ).static_order())
+
+
+def read_chunks(filename, to_fields, batch_size, skip=0):
+    """Читает csv файл частями по batch_size строк."""
+    with open(filename, newline='', encoding='utf-8') as csvfile:
+        rows = islice(csv.DictReader(csvfile), skip, None)
+        rows = (to_fields(row) for row in rows)
+        chunk = list(islice(rows, batch_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(rows, batch_size))
+
+
+def validate_file(path, filename):
+    """Разбирает файл и проверяет строки, не обращаясь к базе данных.
+
+    Выполняется в отдельном процессе, поэтому возвращает только
+    количество строк и первые найденные ошибки.
+    """
+    to_fields = FILES[filename][1]
+    rows = 0
+    errors = []
+    with open(os.path.join(path, filename), newline='',
+              encoding='utf-8') as csvfile:
+        for line, row in enumerate(csv.DictReader(csvfile), 2):
+            rows += 1
+            if len(errors) >= MAX_ERRORS:
+                continue
+            try:
+                fields = to_fields(row)
+                for name, value in fields.items():
+                    if name in INTEGER_FIELDS or name.endswith('_id'):
+                        int(value)
+            except (KeyError, TypeError, ValueError) as error:
+                errors.append(f'{filename}:{line}: {error!r}')
+    return filename, rows, errors
+
+
+class Command(BaseCommand):
+    """Заполняет базу данных из csv файлов"""
+
+    help = 'Заполняет базу данных данными из файлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DEFAULT_PATH,
+            help='Каталог с csv файлами',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество строк в одном INSERT',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов для разбора файлов',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить загрузку, прерванную ошибкой',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        self.resume = options['resume']
+        self.verbosity = options['verbosity']
+        state_path = os.path.join(path, STATE_FILENAME)
+        state = {}
+        if self.resume and os.path.exists(state_path):
+            with open(state_path) as state_file:
+                state = json.load(state_file)
+
+        self.validate(path, options['workers'])
+
+        for filename in load_order():
+            self.load_file(path, filename, batch_size, state, state_path)
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        # bulk_create не отправляет сигналы, поэтому рейтинг и статистика
+        # оценок произведений пересчитываются после загрузки отзывов.
+        call_command('rebuild_ratings', stdout=self.stdout)
+        call_command('rebuild_title_stats', stdout=self.stdout)
+        call_command('refresh_rankings', stdout=self.stdout)
+
+    def validate(self, path, workers):
+        """Параллельно проверяет все файлы до начала загрузки."""
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup
+        ) as executor:
+            results = executor.map(
+                validate_file, [path] * len(FILES), FILES
+            )
+            errors = []
+            for filename, rows, file_errors in results:
+                errors.extend(file_errors)
+                if self.verbosity > 1:
+                    self.stdout.write(f'{filename}: проверено строк {rows}')
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+    def load_file(self, path, filename, batch_size, state, state_path):
+        """Загружает файл; каждая часть сохраняется в своей транзакции.
+
+        После каждой части в state_path записывается количество
+        загруженных строк, чтобы --resume продолжил с места ошибки.
+        """
+        model, to_fields, _ = FILES[filename]
+        loaded = state.get(filename, 0)
+        count = 0
+        started = time.monotonic()
+        for chunk in read_chunks(
+            os.path.join(path, filename), to_fields, batch_size, loaded
+        ):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(**fields) for fields in chunk],
+                    batch_size=batch_size,
+                    # Часть могла быть сохранена до записи состояния.
+                    ignore_conflicts=self.resume,
+                )
+            count += len(chunk)
+            state[filename] = loaded + count
+            with open(state_path, 'w') as state_file:
+                json.dump(state, state_file)
+        # Для промежуточной таблицы жанров auto_created — модель Title.
+        objects_bulk_changed.send(sender=model._meta.auto_created or model)
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f'{filename}: загружено строк {count} ({rate:.0f} строк/с)'
+        )
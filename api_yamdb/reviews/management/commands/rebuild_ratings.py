@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from reviews.models import Review, Title
+from reviews.signals import objects_bulk_changed
+
+
+class Command(BaseCommand):
+    """Пересчитывает сохранённые рейтинги произведений по отзывам"""
+
+    help = 'Пересчитывает рейтинги всех произведений с нуля'
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        with transaction.atomic():
+            updated = Title.objects.update(
+                rating_sum=Coalesce(
+                    Subquery(
+                        reviews.annotate(total=Sum('score')).values('total'),
+                        output_field=IntegerField()
+                    ),
+                    0
+                ),
+                rating_count=Coalesce(
+                    Subquery(
+                        reviews.annotate(total=Count('id')).values('total'),
+                        output_field=IntegerField()
+                    ),
+                    0
+                ),
+            )
+        objects_bulk_changed.send(sender=Title)
+        self.stdout.write(f'Пересчитан рейтинг произведений: {updated}')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from reviews.models import Title, TitleStats
+from reviews.signals import objects_bulk_changed
+
+
+class Command(BaseCommand):
+    """Пересчитывает распределение оценок произведений по отзывам"""
+
+    help = 'Пересчитывает статистику оценок всех произведений с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном INSERT',
+        )
+
+    def handle(self, *args, **options):
+        fields = {
+            TitleStats.score_field(score): Count(
+                'reviews', filter=Q(reviews__score=score)
+            )
+            for score in TitleStats.SCORES
+        }
+        rows = Title.objects.order_by().annotate(**fields).values(
+            'id', *fields
+        )
+        with transaction.atomic():
+            TitleStats.objects.all().delete()
+            created = TitleStats.objects.bulk_create(
+                (TitleStats(title_id=row.pop('id'), **row) for row in rows),
+                batch_size=options['batch_size'],
+            )
+        objects_bulk_changed.send(sender=Title)
+        self.stdout.write(
+            f'Пересчитана статистика оценок произведений: {len(created)}'
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+from reviews.ranking import refresh_rankings
+from reviews.signals import objects_bulk_changed
+
+
+class Command(BaseCommand):
+    """Пересчитывает рейтинги для /titles/top/ и /titles/trending/"""
+
+    help = (
+        'Пересчитывает взвешенный рейтинг и количество новых отзывов '
+        'всех произведений. Запускается периодически.'
+    )
+
+    def handle(self, *args, **options):
+        updated = refresh_rankings()
+        objects_bulk_changed.send(sender=Title)
+        self.stdout.write(f'Пересчитаны рейтинги произведений: {updated}')
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-18 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleStats = apps.get_model('reviews', 'TitleStats')
+    fields = {
+        f'score_{score}': models.Count(
+            'reviews', filter=models.Q(reviews__score=score)
+        )
+        for score in range(1, 11)
+    }
+    TitleStats.objects.bulk_create(
+        [
+            TitleStats(title_id=row.pop('id'), **row)
+            for row in Title.objects.annotate(**fields).values(
+                'id', *fields
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.title', verbose_name='Произведение')),
+                ('score_1', models.PositiveIntegerField(default=0, verbose_name='оценок 1')),
+                ('score_2', models.PositiveIntegerField(default=0, verbose_name='оценок 2')),
+                ('score_3', models.PositiveIntegerField(default=0, verbose_name='оценок 3')),
+                ('score_4', models.PositiveIntegerField(default=0, verbose_name='оценок 4')),
+                ('score_5', models.PositiveIntegerField(default=0, verbose_name='оценок 5')),
+                ('score_6', models.PositiveIntegerField(default=0, verbose_name='оценок 6')),
+                ('score_7', models.PositiveIntegerField(default=0, verbose_name='оценок 7')),
+                ('score_8', models.PositiveIntegerField(default=0, verbose_name='оценок 8')),
+                ('score_9', models.PositiveIntegerField(default=0, verbose_name='оценок 9')),
+                ('score_10', models.PositiveIntegerField(default=0, verbose_name='оценок 10')),
+            ],
+            options={
+                'verbose_name': 'Статистика оценок',
+                'verbose_name_plural': 'Статистика оценок',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 3.2 on 2026-10-18 17:40
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+title_search = import_module('reviews.migrations.0005_title_search')
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite добавляет и удаляет поля, пересоздавая таблицу, а триггеры
+    # поискового индекса удаляются вместе со старой таблицей.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in title_search.SQLITE_FORWARD:
+        if 'CREATE TRIGGER' in statement:
+            schema_editor.execute(statement.replace(
+                'CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS'
+            ))
+
+
+def fill_rankings(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    totals = Title.objects.aggregate(
+        total=models.Sum('rating_sum'), count=models.Sum('rating_count')
+    )
+    mean = totals['total'] / totals['count'] if totals['count'] else 0.0
+    prior = settings.TITLE_RATING_PRIOR_WEIGHT
+    recent = Review.objects.filter(
+        title=models.OuterRef('pk'),
+        pub_date__gte=timezone.now() - settings.TRENDING_WINDOW,
+    ).order_by().values('title').annotate(
+        total=models.Count('id')
+    ).values('total')
+    Title.objects.filter(rating_count__gt=0).update(
+        weighted_rating=models.ExpressionWrapper(
+            (models.Value(float(prior * mean)) + models.F('rating_sum'))
+            / (models.Value(prior) + models.F('rating_count')),
+            output_field=models.FloatField()
+        ),
+    )
+    Title.objects.update(trending_score=Coalesce(
+        models.Subquery(recent, output_field=models.IntegerField()), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_search_triggers
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='trending_score',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество новых отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='взвешенный рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-weighted_rating', '-id'], name='title_weighted_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-trending_score', '-id'], name='title_trending_score_idx'),
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+def create_state(apps, schema_editor):
+    # Средняя оценка, с которой 0008_title_rankings посчитала рейтинги.
+    Title = apps.get_model('reviews', 'Title')
+    RankingState = apps.get_model('reviews', 'RankingState')
+    totals = Title.objects.aggregate(
+        total=models.Sum('rating_sum'), count=models.Sum('rating_count')
+    )
+    mean = totals['total'] / totals['count'] if totals['count'] else 0.0
+    RankingState.objects.create(id=1, mean_score=mean)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mean_score', models.FloatField(default=0, verbose_name='средняя оценка')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, verbose_name='пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Параметры рейтингов',
+                'verbose_name_plural': 'Параметры рейтингов',
+            },
+        ),
+        migrations.RunPython(create_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 19:32
+
+from django.conf import settings
+from django.db import migrations, models
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_ranking_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='author',
+            field=models.ForeignKey(on_delete=reviews.models.cascade_reviews, related_name='reviews', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='title',
+            field=models.ForeignKey(on_delete=reviews.models.cascade_reviews, related_name='reviews', to='reviews.title', verbose_name='Произведение'),
+        ),
+    ]
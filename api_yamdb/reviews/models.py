@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
 from reviews.validators import username_validator, validate_year
 
@@ -58,10 +58,159 @@ class Title(models.Model):
         'описание произведения',
         blank=True,
     )
+    rating_sum = models.PositiveIntegerField(
+        'сумма оценок',
+        default=0,
+        editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        'количество оценок',
+        default=0,
+        editable=False
+    )
+    weighted_rating = models.FloatField(
+        'взвешенный рейтинг',
+        default=0,
+        editable=False
+    )
+    trending_score = models.PositiveIntegerField(
+        'количество новых отзывов',
+        default=0,
+        editable=False
+    )
+
+    # Поля, которые вычисляются по отзывам в reviews.signals и
+    # reviews.ranking и не задаются через API.
+    COMPUTED_FIELDS = (
+        'rating_sum', 'rating_count', 'weighted_rating', 'trending_score'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='title_name_idx'),
+            # Фильтры списка произведений с сортировкой по названию.
+            models.Index(
+                fields=['category', 'name', 'id'],
+                name='title_category_name_idx'
+            ),
+            models.Index(
+                fields=['year', 'name', 'id'], name='title_year_name_idx'
+            ),
+            models.Index(
+                fields=['-weighted_rating', '-id'],
+                name='title_weighted_rating_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='title_trending_score_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Вычисляемые поля меняются только запросами UPDATE из
+        # reviews.signals, поэтому при изменении произведения их
+        # устаревшие значения не записываются.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COMPUTED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating(self):
+        """Средняя оценка произведения."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class TitleStats(models.Model):
+    """Распределение оценок произведения.
+
+    Количество отзывов с каждой оценкой хранится в отдельном поле и
+    изменяется в reviews.signals вместе с рейтингом произведения.
+    """
+    SCORES = range(1, 11)
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Произведение'
+    )
+    score_1 = models.PositiveIntegerField('оценок 1', default=0)
+    score_2 = models.PositiveIntegerField('оценок 2', default=0)
+    score_3 = models.PositiveIntegerField('оценок 3', default=0)
+    score_4 = models.PositiveIntegerField('оценок 4', default=0)
+    score_5 = models.PositiveIntegerField('оценок 5', default=0)
+    score_6 = models.PositiveIntegerField('оценок 6', default=0)
+    score_7 = models.PositiveIntegerField('оценок 7', default=0)
+    score_8 = models.PositiveIntegerField('оценок 8', default=0)
+    score_9 = models.PositiveIntegerField('оценок 9', default=0)
+    score_10 = models.PositiveIntegerField('оценок 10', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика оценок'
+        verbose_name_plural = 'Статистика оценок'
+
+    def __str__(self):
+        return str(self.title_id)
+
+    @staticmethod
+    def score_field(score):
+        return f'score_{score}'
+
+    @property
+    def histogram(self):
+        """Количество отзывов с каждой оценкой."""
+        return {
+            score: getattr(self, self.score_field(score))
+            for score in self.SCORES
+        }
+
+    @property
+    def count(self):
+        return sum(self.histogram.values())
+
+    @property
+    def median(self):
+        """Медиана оценок произведения."""
+        count = self.count
+        if not count:
+            return None
+        middle = ((count - 1) // 2, count // 2)
+        values = []
+        seen = 0
+        for score, score_count in self.histogram.items():
+            seen += score_count
+            while len(values) < 2 and seen > middle[len(values)]:
+                values.append(score)
+        return sum(values) / 2
+
+
+class RankingState(models.Model):
+    """Общие параметры рейтингов произведений.
+
+    Единственная строка хранит среднюю оценку m, с которой считается
+    взвешенный рейтинг; её меняет reviews.ranking.refresh_rankings, а
+    читают все процессы, которые обновляют рейтинги при записи отзывов.
+    """
+    mean_score = models.FloatField('средняя оценка', default=0)
+    refreshed_at = models.DateTimeField('пересчитано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Параметры рейтингов'
+        verbose_name_plural = 'Параметры рейтингов'
+
+    def __str__(self):
+        return f'{self.mean_score:.3f}'
+
 
 class User(AbstractUser):
     """Кастомный пользователь"""
@@ -102,6 +251,18 @@ class User(AbstractUser):
         max_length=19
     )
 
+    token_version = models.PositiveIntegerField(
+        'версия токенов',
+        default=0,
+        editable=False
+    )
+
+    # Поля, которые копируются в JWT токен. Их изменение делает выданные
+    # ранее токены недействительными.
+    TOKEN_CLAIM_FIELDS = (
+        'username', 'role', 'is_staff', 'is_superuser', 'is_active'
+    )
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -116,6 +277,32 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_token_claims()
+        return instance
+
+    def remember_token_claims(self):
+        """Запоминает значения полей, записанных в токены."""
+        self._token_claims = {
+            field: self.__dict__.get(field)
+            for field in self.TOKEN_CLAIM_FIELDS
+        }
+
+    def save(self, *args, **kwargs):
+        claims = getattr(self, '_token_claims', None)
+        if claims and any(
+            field in self.__dict__ and self.__dict__[field] != value
+            for field, value in claims.items()
+        ):
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self.remember_token_claims()
+
     @property
     def is_moderator(self):
         return self.role == self.MODERATOR
@@ -125,17 +312,29 @@ class User(AbstractUser):
         return self.role == self.ADMIN or self.is_superuser or self.is_staff
 
 
+def cascade_reviews(collector, field, sub_objs, using):
+    """CASCADE для отзывов удаляемого произведения или автора.
+
+    Рейтинг удаляемого произведения не нужен, а рейтинги произведений
+    удаляемого автора reviews.signals уменьшает за один проход до
+    удаления, поэтому post_delete этих отзывов рейтинг не меняет.
+    """
+    for review in sub_objs:
+        review.rating_removed = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
 class Review(models.Model):
     """Отзывы"""
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=cascade_reviews,
         related_name='reviews',
         verbose_name='Автор'
     )
     title = models.ForeignKey(
         Title,
-        on_delete=models.CASCADE,
+        on_delete=cascade_reviews,
         related_name='reviews',
         verbose_name='Произведение'
     )
@@ -168,10 +367,33 @@ class Review(models.Model):
                 name='unique_title_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        """Запоминает оценку, уже учтённую в рейтинге произведения."""
+        self._rated_title_id = self.__dict__.get('title_id')
+        self._rated_score = self.__dict__.get('score')
+
+    def save(self, *args, **kwargs):
+        # Рейтинг произведения обновляется в post_save,
+        # в одной транзакции с самим отзывом.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Комментарии"""
@@ -200,6 +422,29 @@ class Comment(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text[:15]
+
+
+class CacheVersion(models.Model):
+    """Версия группы записей кэша API.
+
+    Версии меняются в api.cache.bump_versions после изменения данных и
+    общие для всех процессов приложения.
+    """
+    name = models.CharField('группа', max_length=255, primary_key=True)
+    version = models.BigIntegerField('версия')
+
+    class Meta:
+        verbose_name = 'Версия кэша'
+        verbose_name_plural = 'Версии кэша'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              IntegerField, OuterRef, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from reviews.models import RankingState, Review, Title
+
+MEAN_SCORE_KEY = 'ranking:mean-score'
+# id единственной строки RankingState.
+STATE_ID = 1
+
+
+def compute_mean_score():
+    """Средняя оценка по всем отзывам."""
+    totals = Title.objects.aggregate(
+        total=Sum('rating_sum'), count=Sum('rating_count')
+    )
+    if not totals['count']:
+        return 0.0
+    return totals['total'] / totals['count']
+
+
+def get_mean_score():
+    """Средняя оценка по всем отзывам на момент обновления рейтингов.
+
+    Оценка хранится в RankingState, чтобы все процессы считали рейтинги
+    с тем же m, что и refresh_rankings, и кэшируется процессом на
+    MEAN_SCORE_CACHE_TIMEOUT секунд.
+    """
+    mean = cache.get(MEAN_SCORE_KEY)
+    if mean is None:
+        mean = RankingState.objects.filter(id=STATE_ID).values_list(
+            'mean_score', flat=True
+        ).first()
+        if mean is None:
+            # Строка создаётся миграцией и refresh_rankings.
+            mean = compute_mean_score()
+        cache.set(MEAN_SCORE_KEY, mean, settings.MEAN_SCORE_CACHE_TIMEOUT)
+    return mean
+
+
+def weighted_rating(score_delta=0, count_delta=0):
+    """Взвешенный рейтинг после изменения суммы и количества оценок.
+
+    Байесовское среднее (C * m + сумма) / (C + количество), где m - средняя
+    оценка по всем отзывам, а C - TITLE_RATING_PRIOR_WEIGHT. Произведения
+    с малым числом отзывов получают рейтинг ближе к среднему, без отзывов
+    - ноль. Выражение подставляется в тот же UPDATE, что меняет сумму и
+    количество оценок, поэтому использует их значения до изменения.
+    """
+    prior = settings.TITLE_RATING_PRIOR_WEIGHT
+    return Case(
+        When(rating_count=-count_delta, then=Value(0.0)),
+        default=ExpressionWrapper(
+            (
+                Value(float(prior * get_mean_score()))
+                + F('rating_sum') + score_delta
+            ) / (Value(prior) + F('rating_count') + count_delta),
+            output_field=FloatField()
+        ),
+        output_field=FloatField(),
+    )
+
+
+def trending_score(delta):
+    return Greatest(F('trending_score') + delta, 0)
+
+
+def is_trending(review):
+    """Учитывается ли отзыв в trending_score своего произведения."""
+    return review.pub_date >= timezone.now() - settings.TRENDING_WINDOW
+
+
+def refresh_rankings():
+    """Пересчитывает средние оценки и рейтинги всех произведений.
+
+    Между вызовами рейтинги обновляются при изменении отзывов, но
+    средняя оценка m не меняется, а отзывы старше TRENDING_WINDOW
+    продолжают учитываться в trending_score.
+    """
+    mean = compute_mean_score()
+    RankingState.objects.update_or_create(
+        id=STATE_ID, defaults={'mean_score': mean}
+    )
+    cache.set(MEAN_SCORE_KEY, mean, settings.MEAN_SCORE_CACHE_TIMEOUT)
+    recent = Review.objects.filter(
+        title=OuterRef('pk'),
+        pub_date__gte=timezone.now() - settings.TRENDING_WINDOW,
+    ).order_by().values('title').annotate(
+        total=Count('id')
+    ).values('total')
+    return Title.objects.update(
+        weighted_rating=weighted_rating(),
+        trending_score=Coalesce(
+            Subquery(recent, output_field=IntegerField()), 0
+        ),
+    )
@@ -0,0 +1,138 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+SQLITE_TABLE = 'reviews_title_fts'
+# Вес совпадения в названии выше, чем в описании.
+SQLITE_RANK = f'bm25({SQLITE_TABLE}, 10.0, 1.0)'
+POSTGRESQL_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(reviews_title.name, '')), "
+    "'A') || setweight(to_tsvector('simple', "
+    "coalesce(reviews_title.description, '')), 'B')"
+)
+POSTGRESQL_QUERY = "to_tsquery('simple', %s)"
+# Триггеры, которые синхронизируют индекс FTS5 с таблицей произведений.
+# SQLite удаляет их, когда миграция пересоздаёт таблицу reviews_title,
+# поэтому они пересоздаются после каждого migrate.
+SQLITE_TRIGGERS = {
+    'reviews_title_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_insert
+        AFTER INSERT ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    'reviews_title_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_delete
+        AFTER DELETE ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts
+                (reviews_title_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    'reviews_title_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_update
+        AFTER UPDATE OF name, description ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts
+                (reviews_title_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO reviews_title_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def get_terms(text):
+    """Слова поискового запроса без служебных символов."""
+    return re.findall(r'\w+', text.lower())
+
+
+def search_sqlite(queryset, terms):
+    query = ' '.join(f'"{term}"*' for term in terms)
+    return queryset.extra(
+        select={'search_rank': SQLITE_RANK},
+        tables=[SQLITE_TABLE],
+        where=[
+            f'{SQLITE_TABLE}.rowid = reviews_title.id',
+            f'{SQLITE_TABLE} MATCH %s',
+        ],
+        params=[query],
+        order_by=['search_rank'],
+    )
+
+
+def search_postgresql(queryset, terms):
+    query = ' & '.join(f'{term}:*' for term in terms)
+    return queryset.extra(
+        select={
+            'search_rank': (
+                f'ts_rank({POSTGRESQL_VECTOR}, {POSTGRESQL_QUERY})'
+            ),
+        },
+        select_params=[query],
+        where=[f'{POSTGRESQL_VECTOR} @@ {POSTGRESQL_QUERY}'],
+        params=[query],
+        order_by=['-search_rank'],
+    )
+
+
+def search_fallback(queryset, terms):
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(name__icontains=term) | Q(description__icontains=term)
+        )
+    return queryset.filter(condition)
+
+
+def search_titles(queryset, text):
+    """Полнотекстовый поиск произведений по названию и описанию.
+
+    Каждое слово запроса ищется как префикс, найденные произведения
+    сортируются по релевантности. На SQLite используется индекс FTS5,
+    на PostgreSQL — GIN индекс по tsvector, созданные миграцией
+    0005_title_search; на остальных СУБД — поиск через icontains.
+    """
+    terms = get_terms(text)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return search_sqlite(queryset, terms)
+    if vendor == 'postgresql':
+        return search_postgresql(queryset, terms)
+    return search_fallback(queryset, terms)
+
+
+def restore_search_triggers(using, **kwargs):
+    """Пересоздаёт удалённые триггеры индекса FTS5 после migrate.
+
+    Изменения произведений, сделанные без триггеров, не попали в индекс,
+    поэтому тогда индекс перестраивается целиком.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE name = %s OR type = 'trigger' AND tbl_name = %s",
+            [SQLITE_TABLE, 'reviews_title'],
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if SQLITE_TABLE not in existing:
+            # Миграция 0005_title_search ещё не применена.
+            return
+        missing = SQLITE_TRIGGERS.keys() - existing
+        for name in sorted(missing):
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} ({SQLITE_TABLE}) "
+                "VALUES ('rebuild')"
+            )
@@ -0,0 +1,181 @@
+from collections import Counter
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from reviews.models import Review, Title, TitleStats, User
+from reviews.ranking import is_trending, trending_score, weighted_rating
+
+
+def change_rating(title_id, score_delta, count_delta, trending_delta=0):
+    """Изменяет сохранённые сумму и количество оценок произведения.
+
+    В том же запросе обновляются взвешенный рейтинг и количество новых
+    отзывов произведения.
+    """
+    Title.objects.filter(id=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        weighted_rating=weighted_rating(score_delta, count_delta),
+        trending_score=trending_score(trending_delta),
+    )
+
+
+# bulk_create не отправляет post_save, поэтому код, создающий отзывы
+# пачкой, отправляет этот сигнал со списком созданных отзывов.
+reviews_bulk_created = Signal()
+# То же для произведений, созданных или изменённых bulk-запросами.
+titles_bulk_saved = Signal()
+# Команды, которые меняют объекты запросами UPDATE и INSERT без сигналов
+# моделей, отправляют этот сигнал с моделью изменённых объектов в sender.
+objects_bulk_changed = Signal()
+
+
+def change_ratings(deltas):
+    """Изменяет рейтинг нескольких произведений.
+
+    deltas: {id произведения: (изменение суммы, изменение количества,
+    изменение количества новых отзывов)}. Количество запросов не зависит
+    от количества произведений.
+    """
+    if not deltas:
+        return
+
+    def delta(position):
+        return Case(
+            *[
+                When(id=title_id, then=Value(values[position]))
+                for title_id, values in deltas.items()
+            ],
+            output_field=IntegerField(),
+        )
+
+    titles = Title.objects.filter(id__in=deltas)
+    titles.update(
+        rating_sum=F('rating_sum') + delta(0),
+        rating_count=F('rating_count') + delta(1),
+        trending_score=F('trending_score') + delta(2),
+    )
+    titles.update(weighted_rating=weighted_rating())
+
+
+def create_stats(title_ids):
+    """Создаёт пустую статистику оценок произведений, у которых её нет."""
+    TitleStats.objects.bulk_create(
+        [TitleStats(title_id=title_id) for title_id in title_ids],
+        ignore_conflicts=True,
+    )
+
+
+def change_stats(deltas):
+    """Изменяет распределение оценок нескольких произведений.
+
+    deltas: {id произведения: {оценка: изменение количества}}.
+    Возвращает количество изменённых строк TitleStats.
+    """
+    whens = {}
+    for title_id, scores in deltas.items():
+        for score, delta in scores.items():
+            whens.setdefault(TitleStats.score_field(score), []).append(
+                When(title_id=title_id, then=Value(delta))
+            )
+    if not whens:
+        return 0
+    return TitleStats.objects.filter(title_id__in=deltas).update(**{
+        field: F(field) + Case(
+            *field_whens, default=Value(0), output_field=IntegerField()
+        )
+        for field, field_whens in whens.items()
+    })
+
+
+def change_title_stats(title_id, scores):
+    if not change_stats({title_id: scores}):
+        # Статистика создаётся вместе с произведением, но её может не
+        # быть у произведений, добавленных bulk_create.
+        create_stats([title_id])
+        change_stats({title_id: scores})
+
+
+@receiver(post_save, sender=Title)
+def create_stats_on_save(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        create_stats([instance.pk])
+
+
+@receiver(titles_bulk_saved, sender=Title)
+def create_stats_on_bulk_save(sender, titles, **kwargs):
+    create_stats([title.pk for title in titles])
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    rated_title_id = getattr(instance, '_rated_title_id', None)
+    rated_score = getattr(instance, '_rated_score', None)
+    trending = int(is_trending(instance))
+    if created or rated_title_id is None:
+        change_rating(instance.title_id, instance.score, 1, trending)
+        change_title_stats(instance.title_id, {instance.score: 1})
+    elif rated_title_id != instance.title_id:
+        change_rating(rated_title_id, -rated_score, -1, -trending)
+        change_title_stats(rated_title_id, {rated_score: -1})
+        change_rating(instance.title_id, instance.score, 1, trending)
+        change_title_stats(instance.title_id, {instance.score: 1})
+    elif rated_score != instance.score:
+        change_rating(instance.title_id, instance.score - rated_score, 0)
+        change_title_stats(
+            instance.title_id, {rated_score: -1, instance.score: 1}
+        )
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    if getattr(instance, 'rating_removed', False):
+        return
+    change_rating(
+        instance.title_id, -instance.score, -1, -int(is_trending(instance))
+    )
+    change_stats({instance.title_id: {instance.score: -1}})
+
+
+@receiver(reviews_bulk_created, sender=Review)
+def update_rating_on_bulk_create(sender, reviews, **kwargs):
+    deltas = {}
+    scores = {}
+    for review in reviews:
+        score, count, _ = deltas.get(review.title_id, (0, 0, 0))
+        deltas[review.title_id] = (score + review.score, count + 1, count + 1)
+        scores.setdefault(review.title_id, Counter())[review.score] += 1
+        review.remember_rating_state()
+    change_ratings(deltas)
+    create_stats(scores)
+    change_stats(scores)
+
+
+@receiver(pre_delete, sender=User)
+def update_ratings_on_author_delete(sender, instance, **kwargs):
+    """Убирает из рейтингов отзывы удаляемого пользователя.
+
+    Отзывы удаляются каскадом без пересчёта рейтинга в post_delete (см.
+    reviews.models.cascade_reviews), поэтому изменения всех произведений
+    автора складываются и записываются вместе.
+    """
+    deltas = {}
+    scores = {}
+    reviews = Review.objects.filter(author=instance).only(
+        'title_id', 'score', 'pub_date'
+    )
+    for review in reviews:
+        score, count, trending = deltas.get(review.title_id, (0, 0, 0))
+        deltas[review.title_id] = (
+            score - review.score,
+            count - 1,
+            trending - int(is_trending(review)),
+        )
+        scores.setdefault(review.title_id, Counter())[review.score] -= 1
+    change_ratings(deltas)
+    change_stats(scores)
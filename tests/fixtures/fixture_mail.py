@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_mail_queue(settings):
+    """Письма из очереди отправляются сразу, как при работе обработчика."""
+    settings.MAIL_QUEUE_EAGER = True
@@ -0,0 +1,33 @@
+import pytest
+
+from api.middleware import query_budget_exceeded
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'no_query_budget: не проверять лимиты SQL запросов в тесте'
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Проваливает тест, если запрос к API превысил лимит SQL запросов."""
+    if item.get_closest_marker('no_query_budget'):
+        yield
+        return
+    violations = []
+
+    def collect(sender, route, count, budget, **kwargs):
+        violations.append(f'{route}: {count} SQL запросов при лимите {budget}')
+
+    query_budget_exceeded.connect(collect, weak=False)
+    try:
+        yield
+    finally:
+        query_budget_exceeded.disconnect(collect)
+    if violations:
+        pytest.fail(
+            'Превышен лимит SQL запросов:\n' + '\n'.join(violations),
+            pytrace=False
+        )
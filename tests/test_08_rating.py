@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    def test_01_rating_follows_reviews(self, admin_client, user_client,
+                                       moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/'
+
+        assert admin_client.get(url).json()['rating'] is None, (
+            'Рейтинг произведения без отзывов должен быть равен `None`.'
+        )
+        create_single_review(user_client, title_id, 'text', 4)
+        review = create_single_review(
+            moderator_client, title_id, 'text', 8
+        ).json()
+        assert admin_client.get(url).json()['rating'] == 6, (
+            'Рейтинг должен пересчитываться при создании отзыва.'
+        )
+
+        review_url = f'/api/v1/titles/{title_id}/reviews/{review["id"]}/'
+        response = moderator_client.patch(review_url, data={'score': 10})
+        assert response.status_code == HTTPStatus.OK
+        assert admin_client.get(url).json()['rating'] == 7, (
+            'Рейтинг должен пересчитываться при изменении оценки.'
+        )
+
+        response = moderator_client.delete(review_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert admin_client.get(url).json()['rating'] == 4, (
+            'Рейтинг должен пересчитываться при удалении отзыва.'
+        )
+
+    def test_02_rebuild_ratings(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'text', 9)
+        Title.objects.update(rating_sum=0, rating_count=0)
+
+        call_command('rebuild_ratings')
+
+        title = Title.objects.get(id=title_id)
+        assert (title.rating_sum, title.rating_count) == (9, 1), (
+            'Команда `rebuild_ratings` должна пересчитывать рейтинг '
+            'произведений по отзывам.'
+        )
+        title = Title.objects.get(id=titles[1]['id'])
+        assert (title.rating_sum, title.rating_count) == (0, 0)
+
+    def test_03_title_update_keeps_rating(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(id=titles[0]['id'])
+        create_single_review(user_client, title.id, 'text', 6)
+
+        title.name = 'Новое название'
+        title.save()
+
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (6, 1), (
+            'Сохранение произведения не должно перезаписывать рейтинг, '
+            'изменённый отзывами.'
+        )
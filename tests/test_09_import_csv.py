@@ -0,0 +1,93 @@
+import csv
+import os
+import shutil
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.utils import IntegrityError
+
+from reviews.models import Comment, Review, Title, User
+from tests.conftest import MANAGE_PATH
+
+DATA_PATH = os.path.join(MANAGE_PATH, 'static', 'data')
+
+
+def count_rows(filename):
+    with open(os.path.join(DATA_PATH, filename), newline='') as csvfile:
+        return sum(1 for _ in csv.DictReader(csvfile))
+
+
+def replace_in_file(filename, old, new):
+    with open(filename, encoding='utf-8') as csvfile:
+        content = csvfile.read()
+    with open(filename, 'w', encoding='utf-8') as csvfile:
+        csvfile.write(content.replace(old, new, 1))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09ImportCsv:
+
+    def test_01_import_csv(self):
+        call_command('import_csv', path=DATA_PATH, batch_size=7, workers=2)
+
+        expected = (
+            (User, 'users.csv'),
+            (Title, 'titles.csv'),
+            (Title.genre.through, 'genre_title.csv'),
+            (Review, 'review.csv'),
+            (Comment, 'comments.csv'),
+        )
+        for model, filename in expected:
+            assert model.objects.count() == count_rows(filename), (
+                f'Команда `import_csv` должна загружать все строки '
+                f'из файла `{filename}`.'
+            )
+        title = Title.objects.filter(rating_count__gt=0).first()
+        assert title.rating_count == title.reviews.count(), (
+            'После загрузки отзывов рейтинг произведений должен быть '
+            'пересчитан.'
+        )
+
+    def test_02_invalid_file(self, tmp_path):
+        shutil.copytree(DATA_PATH, tmp_path, dirs_exist_ok=True)
+        replace_in_file(tmp_path / 'titles.csv', ',1994,', ',год,')
+
+        with pytest.raises(CommandError):
+            call_command('import_csv', path=str(tmp_path), workers=2)
+        assert not User.objects.exists(), (
+            'Команда `import_csv` должна проверять файлы до загрузки.'
+        )
+
+    def test_03_resume(self, tmp_path):
+        shutil.copytree(DATA_PATH, tmp_path, dirs_exist_ok=True)
+        reviews = tmp_path / 'review.csv'
+        with open(reviews, newline='', encoding='utf-8') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        broken_id = rows[3]['title_id']
+        rows[3]['title_id'] = '999999'
+        with open(reviews, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+
+        with pytest.raises(IntegrityError):
+            call_command(
+                'import_csv', path=str(tmp_path), batch_size=2, workers=2
+            )
+        assert Review.objects.count() == 2
+
+        rows[3]['title_id'] = broken_id
+        with open(reviews, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+        call_command(
+            'import_csv', path=str(tmp_path), batch_size=2, workers=2,
+            resume=True
+        )
+        assert Review.objects.count() == len(rows), (
+            'Команда `import_csv --resume` должна продолжать загрузку '
+            'с части, на которой произошла ошибка.'
+        )
+        assert not os.path.exists(tmp_path / '.import_csv_state.json')
@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.middleware import query_budget_exceeded
+from api.views import TitleViewSet, UserViewSet
+from reviews.models import Comment, Review, Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10QueryBudget:
+
+    @pytest.mark.no_query_budget
+    def test_01_budget_exceeded_signal(self, admin_client, monkeypatch):
+        create_titles(admin_client)
+        monkeypatch.setattr(TitleViewSet, 'query_budget', {'list': 1})
+        violations = []
+
+        def collect(sender, route, count, budget, **kwargs):
+            violations.append((route, count, budget))
+
+        query_budget_exceeded.connect(collect, weak=False)
+        try:
+            admin_client.get('/api/v1/titles/')
+        finally:
+            query_budget_exceeded.disconnect(collect)
+        assert len(violations) == 1, (
+            'При превышении лимита SQL запросов должен отправляться '
+            'сигнал `query_budget_exceeded`.'
+        )
+        route, count, budget = violations[0]
+        assert route == 'TitleViewSet.list'
+        assert count > budget == 1
+
+    @override_settings(DEBUG=True)
+    def test_02_debug_headers(self, client):
+        response = client.get('/api/v1/titles/')
+        assert int(response['X-Query-Count']) > 0, (
+            'В режиме DEBUG ответ должен содержать количество SQL запросов '
+            'в заголовке `X-Query-Count`.'
+        )
+        assert float(response['X-Query-Time']) >= 0
+
+    def test_03_no_debug_headers(self, client):
+        response = client.get('/api/v1/titles/')
+        assert 'X-Query-Count' not in response
+
+    @pytest.mark.parametrize('reviews_count', (1, 20))
+    def test_04_destroy_title_with_reviews(self, admin_client,
+                                           django_user_model,
+                                           reviews_count):
+        title = Title.objects.create(name='Произведение', year=2000)
+        for number in range(reviews_count):
+            author = django_user_model.objects.create(
+                username=f'author{number}', email=f'author{number}@yamdb.fake'
+            )
+            review = Review.objects.create(
+                author=author, title=title, text='Отзыв', score=5
+            )
+            Comment.objects.create(author=author, review=review, text='Да')
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.delete(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert len(context) <= TitleViewSet.query_budget['destroy'], (
+            'Удаление произведения не должно обновлять рейтинг для каждого '
+            'его отзыва.'
+        )
+
+    @pytest.mark.parametrize('titles_count', (1, 20))
+    def test_05_destroy_user_with_reviews(self, admin_client, user,
+                                          moderator, titles_count):
+        titles = [
+            Title.objects.create(name=f'Произведение {number}', year=2000)
+            for number in range(titles_count)
+        ]
+        for title in titles:
+            Review.objects.create(
+                author=user, title=title, text='Отзыв', score=3
+            )
+            Review.objects.create(
+                author=moderator, title=title, text='Отзыв', score=9
+            )
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert len(context) <= UserViewSet.query_budget['destroy'], (
+            'Удаление пользователя должно пересчитывать рейтинги '
+            'произведений за постоянное количество SQL запросов.'
+        )
+        for title in Title.objects.select_related('stats'):
+            assert (title.rating_sum, title.rating_count) == (9, 1), (
+                'После удаления пользователя рейтинг произведений не должен '
+                'учитывать его отзывы.'
+            )
+            assert title.stats.histogram[3] == 0
+            assert title.stats.histogram[9] == 1
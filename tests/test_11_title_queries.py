@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.pagination import TitlePagination
+from reviews.models import Category, Genre, Title
+
+
+@pytest.fixture
+def many_titles():
+    category = Category.objects.create(name='Фильм', slug='film')
+    genres = [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(4)
+    ]
+    for number in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category
+        )
+        title.genre.set(genres[:number % 4 + 1])
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleQueries:
+
+    def test_01_list_queries_are_constant(self, client, many_titles,
+                                          monkeypatch):
+        queries = {}
+        for page_size in (1, 5):
+            # PAGE_SIZE копируется в пагинацию при импорте, а версии данных
+            # и количество могут остаться в кэше от создания произведений.
+            monkeypatch.setattr(TitlePagination, 'page_size', page_size)
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/api/v1/titles/')
+            assert response.status_code == 200
+            assert len(response.json()['results']) == page_size
+            queries[page_size] = len(context)
+        assert queries[1] == queries[5], (
+            'Список произведений должен загружаться за постоянное '
+            'количество SQL запросов независимо от размера страницы.'
+        )
+
+    def test_02_retrieve_queries_are_constant(self, client, many_titles):
+        title = Title.objects.order_by('id').last()
+        assert count_queries(client, f'/api/v1/titles/{title.id}/') == 2, (
+            'Произведение должно загружаться вместе с категорией и жанрами '
+            'за постоянное количество SQL запросов.'
+        )
@@ -0,0 +1,168 @@
+import json
+from base64 import urlsafe_b64encode
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from api.pagination import KeysetPagination
+
+from reviews.models import Category, Genre, Review, Title, User
+
+
+@pytest.fixture
+def title_with_reviews():
+    title = Title.objects.create(name='Произведение', year=2000)
+    for number in range(12):
+        author = User.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        Review.objects.create(
+            title=title, author=author, text='text', score=5
+        )
+    # Часть отзывов с одинаковой датой: порядок задаётся id.
+    Review.objects.filter(id__in=Review.objects.order_by('id')[3:9]).update(
+        pub_date=timezone.now()
+    )
+    return title
+
+
+@pytest.fixture
+def many_titles():
+    category = Category.objects.create(name='Книга', slug='book')
+    genre = Genre.objects.create(name='Рок', slug='rock')
+    titles = []
+    for number in range(13):
+        # Часть названий совпадает: порядок задаётся id.
+        titles.append(Title.objects.create(
+            name=f'Произведение {number % 4}',
+            year=2000,
+            category=category if number % 2 else None,
+        ))
+    genre.titles.set(titles[::3])
+    return titles
+
+
+def collect(client, url, link):
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            'В режиме курсора не должно выполняться подсчёта объектов.'
+        )
+        ids.extend(obj['id'] for obj in data['results'])
+        url = data[link]
+    return ids
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12KeysetPagination:
+
+    def test_01_walk_forward_and_back(self, client, title_with_reviews):
+        expected = list(
+            Review.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        url = f'/api/v1/titles/{title_with_reviews.id}/reviews/?cursor='
+        forward = collect(client, url, 'next')
+        assert forward == expected, (
+            'Проверьте, что курсорная пагинация отзывов возвращает все '
+            'отзывы в порядке `-pub_date`, `-id` без повторов.'
+        )
+
+        response = client.get(url)
+        last_url = url
+        while response.json()['next']:
+            last_url = response.json()['next']
+            response = client.get(last_url)
+        backward = collect(client, response.json()['previous'], 'previous')
+        last_page = response.json()['results']
+        backward_pages = expected[:len(expected) - len(last_page)]
+        assert sorted(backward) == sorted(backward_pages), (
+            'Ссылка `previous` курсорной пагинации должна вести '
+            'на предыдущие страницы.'
+        )
+
+    def test_02_page_number_is_default(self, client, title_with_reviews):
+        response = client.get(
+            f'/api/v1/titles/{title_with_reviews.id}/reviews/'
+        )
+        assert response.json()['count'] == 12
+
+    @pytest.mark.parametrize('url, cursor', (
+        ('reviews', 'xyz'),
+        ('reviews', [1, 2]),
+        ('reviews', [['garbage', 1], False]),
+        ('reviews', [['2020-01-01', 'abc'], False]),
+        ('reviews', [[None, None], False]),
+        ('reviews', [[['2020-01-01'], 1], False]),
+        ('titles', [['a', 'b'], False]),
+        ('titles', [[None, 1], False]),
+    ))
+    def test_03_invalid_cursor(self, client, title_with_reviews, url,
+                               cursor):
+        if url == 'reviews':
+            url = f'/api/v1/titles/{title_with_reviews.id}/reviews/'
+        else:
+            url = '/api/v1/titles/'
+        if not isinstance(cursor, str):
+            cursor = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        response = client.get(f'{url}?cursor={cursor}')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Курсор `{cursor}` с некорректными значениями должен '
+            'возвращать ответ со статусом 404.'
+        )
+
+    @pytest.mark.parametrize('query, condition', (
+        ('', {}),
+        ('&genre=rock', {'genre__slug': 'rock'}),
+        ('&category=book', {'category__slug': 'book'}),
+        ('&name=1', {'name__icontains': '1'}),
+    ))
+    def test_04_titles_walk(self, client, many_titles, query, condition):
+        expected = list(
+            Title.objects.filter(**condition).order_by(
+                'name', 'id'
+            ).values_list('id', flat=True)
+        )
+        forward = collect(client, f'/api/v1/titles/?cursor={query}', 'next')
+        assert forward == expected, (
+            'Проверьте, что курсорная пагинация произведений возвращает '
+            'все отфильтрованные произведения в порядке `name`, `id` '
+            'без повторов.'
+        )
+
+    def test_05_titles_page_number_is_default(self, client, many_titles):
+        response = client.get('/api/v1/titles/?page=3')
+        assert response.json()['count'] == len(many_titles)
+
+    def test_06_titles_uses_name_index(self, many_titles):
+        queryset = Title.objects.order_by('name', 'id').filter(
+            KeysetPagination.get_keyset_filter(
+                ('name', 'id'), ['Произведение 1', many_titles[1].id]
+            )
+        )
+        plan = queryset[:5].explain()
+        assert 'title_name_idx' in plan, (
+            'Страница произведений после курсора должна выбираться по '
+            'индексу `title_name_idx`.'
+        )
+        assert 'TEMP B-TREE' not in plan, (
+            'Страница произведений после курсора не должна сортироваться '
+            'заново.'
+        )
+
+    def test_07_naive_datetime_cursor(self, client, title_with_reviews):
+        cursor = urlsafe_b64encode(
+            json.dumps([['2999-01-01', 1], False]).encode()
+        ).decode()
+        response = client.get(
+            f'/api/v1/titles/{title_with_reviews.id}/reviews/?cursor={cursor}'
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'Курсор с датой без часового пояса должен приниматься.'
+        )
+        assert response.json()['results']
@@ -0,0 +1,130 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Review, Title
+
+
+def create_titles(count, year=2000):
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {number}', year=year)
+        for number in range(count)
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13CachedCount:
+
+    def test_01_count_is_cached(self, client):
+        create_titles(3)
+        assert client.get('/api/v1/titles/').json()['count'] == 3
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == 3
+        assert not any(
+            'COUNT' in query['sql'] for query in context.captured_queries
+        ), 'Количество произведений должно браться из кэша.'
+
+    def test_02_count_per_filter(self, client):
+        create_titles(3)
+        create_titles(2, year=1990)
+        assert client.get('/api/v1/titles/').json()['count'] == 5
+        response = client.get('/api/v1/titles/?year=1990')
+        assert response.json()['count'] == 2, (
+            'Количество объектов должно кэшироваться отдельно для каждого '
+            'набора фильтров.'
+        )
+
+    def test_03_invalidation(self, client):
+        create_titles(3)
+        assert client.get('/api/v1/titles/').json()['count'] == 3
+        Title.objects.create(name='Новое', year=2000)
+        assert client.get('/api/v1/titles/').json()['count'] == 4, (
+            'Кэш количества должен сбрасываться при создании объекта.'
+        )
+        Title.objects.order_by('id').first().delete()
+        assert client.get('/api/v1/titles/').json()['count'] == 3, (
+            'Кэш количества должен сбрасываться при удалении объекта.'
+        )
+
+    def test_04_approximate_count(self, client, settings):
+        settings.PAGINATION_EXACT_COUNT_LIMIT = 5
+        create_titles(20)
+        data = client.get('/api/v1/titles/').json()
+        assert data['count_is_approximate'] is True, (
+            'Если объектов больше PAGINATION_EXACT_COUNT_LIMIT, ответ '
+            'должен отмечать количество как приблизительное.'
+        )
+        assert data['count'] > 5
+
+        ids = []
+        url = '/api/v1/titles/'
+        while url:
+            data = client.get(url).json()
+            assert data['count_is_approximate'] is True
+            ids.extend(title['id'] for title in data['results'])
+            url = data['next']
+        assert sorted(ids) == sorted(
+            Title.objects.values_list('id', flat=True)
+        ), (
+            'Приблизительное количество не должно ограничивать число '
+            'страниц: ссылки next должны вести до последнего объекта.'
+        )
+        assert client.get('/api/v1/titles/?page=4').json()['results'], (
+            'Страницы после оценки количества должны быть доступны.'
+        )
+        response = client.get('/api/v1/titles/?page=5')
+        assert response.status_code == 404, (
+            'Страница после последнего объекта должна возвращать 404.'
+        )
+
+        settings.PAGINATION_EXACT_COUNT_LIMIT = 100
+        Title.objects.create(name='Новое', year=2000)
+        data = client.get('/api/v1/titles/').json()
+        assert data['count'] == 21
+        assert 'count_is_approximate' not in data
+
+    def test_05_invalidation_by_category_and_genre(self, client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        horror = Genre.objects.create(name='Ужасы', slug='horror')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(
+            name='Произведение', year=2000, category=category
+        )
+        title.genre.set([horror, drama])
+        for url in ('/api/v1/titles/?genre=horror',
+                    '/api/v1/titles/?genre=drama',
+                    '/api/v1/titles/?category=films'):
+            assert client.get(url).json()['count'] == 1
+
+        horror.delete()
+        category.delete()
+        title.genre.remove(drama)
+        for url in ('/api/v1/titles/?genre=horror',
+                    '/api/v1/titles/?genre=drama',
+                    '/api/v1/titles/?category=films'):
+            data = client.get(url).json()
+            assert (data['count'], data['results']) == (0, []), (
+                'Кэш количества произведений должен сбрасываться при '
+                'удалении категорий и жанров и изменении жанров '
+                'произведения.'
+            )
+
+    def test_06_review_counts_per_title(self, client, user, moderator):
+        first = Title.objects.create(name='Первое', year=2000)
+        second = Title.objects.create(name='Второе', year=2000)
+        Review.objects.create(author=user, title=first, text='1', score=5)
+        url = f'/api/v1/titles/{first.id}/reviews/'
+        assert client.get(url).json()['count'] == 1
+
+        Review.objects.create(author=user, title=second, text='2', score=5)
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(url).json()['count'] == 1
+        assert not any(
+            'COUNT' in query['sql'] for query in context.captured_queries
+        ), (
+            'Отзыв к другому произведению не должен сбрасывать кэш '
+            'количества отзывов.'
+        )
+        Review.objects.create(author=moderator, title=first, text='3', score=5)
+        assert client.get(url).json()['count'] == 2
@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title
+from tests.utils import create_single_review, create_titles
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), len(context)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14ResponseCache:
+
+    @pytest.mark.parametrize(
+        'url', ('/api/v1/titles/', '/api/v1/categories/', '/api/v1/genres/')
+    )
+    def test_01_repeat_read_without_sql(self, client, admin_client, url):
+        create_titles(admin_client)
+        first, _ = get(client, url)
+        second, queries = get(client, url)
+        assert second == first
+        assert queries == 0, (
+            f'Повторный GET-запрос к `{url}` должен обслуживаться из кэша '
+            'без SQL запросов.'
+        )
+
+    def test_02_key_includes_query_params(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        all_titles, _ = get(client, '/api/v1/titles/')
+        films, _ = get(client, '/api/v1/titles/?category=films')
+        assert all_titles['count'] == 2
+        assert films['count'] == 1
+
+    def test_03_invalidated_by_review(self, client, admin_client,
+                                      user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert get(client, url)[0]['rating'] is None
+        get(client, '/api/v1/titles/')
+        create_single_review(user_client, titles[0]['id'], 'text', 7)
+        assert get(client, url)[0]['rating'] == 7, (
+            'Кэш произведения должен сбрасываться при создании отзыва.'
+        )
+        data, _ = get(client, '/api/v1/titles/')
+        ratings = {title['id']: title['rating'] for title in data['results']}
+        assert ratings[titles[0]['id']] == 7
+
+    def test_04_invalidated_by_category_and_genre(self, client,
+                                                  admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        get(client, url)
+        get(client, '/api/v1/categories/')
+        Category.objects.filter(slug='films').update(name='Кино')
+        Category.objects.get(slug='films').save()
+        assert get(client, url)[0]['category']['name'] == 'Кино'
+        names = [
+            category['name']
+            for category in get(client, '/api/v1/categories/')[0]['results']
+        ]
+        assert 'Кино' in names, (
+            'Кэш категорий должен сбрасываться при изменении категории.'
+        )
+        Genre.objects.get(slug='horror').delete()
+        genres = [genre['slug'] for genre in get(client, url)[0]['genre']]
+        assert 'horror' not in genres
+
+    def test_05_invalidated_by_title_update(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        get(client, url)
+        admin_client.patch(url, data={'genre': ['drama']})
+        genres = [genre['slug'] for genre in get(client, url)[0]['genre']]
+        assert genres == ['drama']
+        Title.objects.filter(id=titles[0]['id']).delete()
+        assert client.get(url).status_code == 404
+
+    def test_06_key_includes_scheme_and_host(self, client):
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {number}', year=2000)
+            for number in range(6)
+        )
+        client.get('/api/v1/titles/', HTTP_HOST='a.example')
+        response = client.get(
+            '/api/v1/titles/', HTTP_HOST='b.example', secure=True
+        )
+        assert response.json()['next'] == (
+            'https://b.example/api/v1/titles/?page=2'
+        ), (
+            'Ссылки из кэша ответов должны указывать на схему и хост '
+            'текущего запроса.'
+        )
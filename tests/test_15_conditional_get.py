@@ -0,0 +1,143 @@
+import time
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import VERSION_KEY
+from reviews.models import CacheVersion, Title
+from tests.utils import create_comments, create_reviews, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15ConditionalGet:
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/', '/api/v1/categories/', '/api/v1/genres/'
+    ))
+    def test_01_if_none_match(self, client, admin_client, url):
+        create_titles(admin_client)
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'GET-запрос к `{url}` с актуальным `If-None-Match` должен '
+            'возвращать ответ со статусом 304.'
+        )
+        assert not response.content
+        assert len(context) == 0
+
+    def test_02_reviews_validators_change(self, admin_client, user,
+                                          user_client, client):
+        reviews, titles = create_reviews(admin_client, {user: user_client})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'GET-запрос с актуальным `If-Modified-Since` должен возвращать '
+            'ответ со статусом 304.'
+        )
+
+        user_client.patch(f'{url}{reviews[0]["id"]}/', data={'text': 'new'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'После изменения отзыва ETag списка отзывов должен измениться.'
+        )
+        assert response.json()['results'][0]['text'] == 'new'
+
+    def test_03_user_rename_changes_review_etag(self, admin_client, user,
+                                                user_client, client):
+        _, titles = create_reviews(admin_client, {user: user_client})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        etag = client.get(url)['ETag']
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['results'][0]['author'] == 'renamed'
+
+    def test_04_etag_depends_on_role(self, admin_client, user_client,
+                                     client):
+        create_titles(admin_client)
+        etag = client.get('/api/v1/titles/')['ETag']
+        response = user_client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_05_rebuild_command_changes_etag(self, admin_client, user,
+                                             user_client, client):
+        create_reviews(admin_client, {user: user_client})
+        etag = client.get('/api/v1/titles/')['ETag']
+        # Команда меняет рейтинг запросом UPDATE без сигналов моделей.
+        Title.objects.update(rating_sum=0, rating_count=0)
+        call_command('rebuild_ratings', stdout=StringIO())
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'После пересчёта рейтингов командой ETag списка произведений '
+            'должен измениться.'
+        )
+
+    def test_06_version_changed_in_other_process(self, admin_client,
+                                                 client):
+        create_titles(admin_client)
+        url = '/api/v1/titles/'
+        etag = client.get(url)['ETag']
+        # Другой процесс меняет версию в базе, а кэш этого процесса
+        # хранит её не дольше CACHE_VERSION_TIMEOUT.
+        CacheVersion.objects.update_or_create(
+            name='titles', defaults={'version': time.time_ns()}
+        )
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+            HTTPStatus.NOT_MODIFIED
+        )
+        cache.delete(VERSION_KEY.format('titles'))
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Версия данных, изменённая в другом процессе, должна менять '
+            'ETag после истечения CACHE_VERSION_TIMEOUT.'
+        )
+
+    def test_07_expanded_objects_change_etag(self, admin_client, user,
+                                             user_client, client):
+        _, reviews, titles = create_comments(
+            admin_client, {user: user_client}
+        )
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        etag = client.get(f'{reviews_url}?expand=title')['ETag']
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Новое'}
+        )
+        response = client.get(
+            f'{reviews_url}?expand=title', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'С `expand=title` ETag отзывов должен меняться при изменении '
+            'произведения.'
+        )
+        assert response.json()['results'][0]['title']['name'] == 'Новое'
+
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        etag = client.get(f'{comments_url}?expand=review')['ETag']
+        user_client.patch(f'{reviews_url}{reviews[0]["id"]}/', data={
+            'score': reviews[0]['score'] % 10 + 1
+        })
+        response = client.get(
+            f'{comments_url}?expand=review', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'С `expand=review` ETag комментариев должен меняться при '
+            'изменении отзыва.'
+        )
+        assert response.json()['results'][0]['review']['score'] == (
+            reviews[0]['score'] % 10 + 1
+        )
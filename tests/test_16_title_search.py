@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from reviews.models import Title
+from reviews.search import SQLITE_TRIGGERS
+
+
+def search(client, text):
+    response = client.get('/api/v1/titles/', {'search': text})
+    assert response.status_code == HTTPStatus.OK
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.fixture
+def titles():
+    return [
+        Title.objects.create(
+            name='Крепкий орешек', year=1988,
+            description='Полицейский против террористов'
+        ),
+        Title.objects.create(
+            name='Терминатор', year=1984,
+            description='Киборг из будущего'
+        ),
+        Title.objects.create(
+            name='Чужой', year=1979,
+            description='Терминатор здесь ни при чём, зато есть киборг'
+        ),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16TitleSearch:
+
+    def test_01_prefix_and_ranking(self, client, titles):
+        assert search(client, 'терм') == ['Терминатор', 'Чужой'], (
+            'Поиск должен находить произведения по началу слова в названии '
+            'и описании, совпадения в названии должны быть выше.'
+        )
+
+    def test_02_all_terms_required(self, client, titles):
+        assert search(client, 'киборг будущ') == ['Терминатор']
+        assert search(client, 'ОРЕШЕК') == ['Крепкий орешек']
+
+    def test_03_index_follows_writes(self, client, titles):
+        title = titles[0]
+        title.name = 'Хищник'
+        title.save()
+        assert search(client, 'хищ') == ['Хищник'], (
+            'Поисковый индекс должен обновляться при изменении '
+            'произведения.'
+        )
+        assert search(client, 'орешек') == []
+        title.delete()
+        assert search(client, 'хищ') == []
+
+    def test_04_special_characters(self, client, titles):
+        assert search(client, '"терм*" -(') == ['Терминатор', 'Чужой']
+        assert len(search(client, '  ')) == 3
+
+    @pytest.mark.skipif(
+        connection.vendor != 'sqlite', reason='Триггеры FTS5 есть в SQLite'
+    )
+    def test_05_triggers_restored_after_migrate(self, client, titles):
+        # Так триггеры теряются, когда миграция пересоздаёт reviews_title.
+        with connection.cursor() as cursor:
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        Title.objects.create(name='Хищник', year=1987)
+
+        call_command('migrate', verbosity=0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            )
+            triggers = {name for name, in cursor.fetchall()}
+        assert set(SQLITE_TRIGGERS) <= triggers, (
+            'После migrate триггеры поискового индекса должны быть '
+            'пересозданы.'
+        )
+        assert search(client, 'хищ') == ['Хищник'], (
+            'Произведения, изменённые без триггеров, должны попасть в '
+            'индекс после migrate.'
+        )
+        Title.objects.create(name='Хищники', year=2010)
+        assert search(client, 'хищники') == ['Хищники']
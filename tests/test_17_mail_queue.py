@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from mailqueue.models import OutgoingEmail
+from mailqueue.queue import send_mail, send_queued
+
+
+@pytest.fixture
+def lazy_mail_queue(settings):
+    settings.MAIL_QUEUE_EAGER = False
+    settings.MAIL_QUEUE_RETRY_DELAY = 60
+    settings.MAIL_QUEUE_MAX_ATTEMPTS = 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('lazy_mail_queue')
+class Test17MailQueue:
+
+    def test_01_signup_does_not_send(self, client):
+        outbox_before_count = len(mail.outbox)
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+        response = client.post('/api/v1/auth/signup/', data=data)
+        assert response.status_code == 200
+        assert len(mail.outbox) == outbox_before_count, (
+            'Письмо с кодом подтверждения должно ставиться в очередь, '
+            'а не отправляться во время запроса.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.recipients == ['queued@yamdb.fake']
+
+        call_command('send_queued_mail')
+
+        assert len(mail.outbox) == outbox_before_count + 1
+        assert mail.outbox[-1].to == ['queued@yamdb.fake']
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+        assert email.body == '', (
+            'После отправки текст письма с кодом подтверждения должен '
+            'удаляться из очереди.'
+        )
+
+    def test_02_batch_uses_one_connection(self, monkeypatch):
+        for number in range(3):
+            send_mail('Тема', 'Текст', None, [f'user{number}@yamdb.fake'])
+        connections = []
+        get_connection = mail.get_connection
+
+        def counting_get_connection(*args, **kwargs):
+            connections.append(get_connection(*args, **kwargs))
+            return connections[-1]
+
+        monkeypatch.setattr(mail, 'get_connection', counting_get_connection)
+        assert send_queued(batch_size=10) == (3, 0)
+        assert len(connections) == 1, (
+            'Пачка писем должна отправляться через одно соединение.'
+        )
+
+    def test_03_retry_with_backoff(self, monkeypatch):
+        send_mail('Тема', 'Текст', None, ['user@yamdb.fake'])
+
+        def fail(self):
+            raise ConnectionError('SMTP недоступен')
+
+        monkeypatch.setattr(mail.EmailMessage, 'send', fail)
+        assert send_queued() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.attempts == 1
+        assert email.next_attempt_at > timezone.now() + timedelta(seconds=50)
+        assert send_queued() == (0, 0), (
+            'Письмо не должно отправляться повторно до истечения задержки.'
+        )
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert send_queued() == (0, 1)
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.FAILED, (
+            'После MAIL_QUEUE_MAX_ATTEMPTS попыток письмо должно '
+            'помечаться как неотправленное.'
+        )
+        assert email.body == ''
+
+    def test_04_admin_hides_body(self, client, user_superuser):
+        email = send_mail('Тема', 'Код: 12345', None, ['user@yamdb.fake'])
+        client.force_login(user_superuser)
+        response = client.get(
+            f'/admin/mailqueue/outgoingemail/{email.id}/change/'
+        )
+        assert response.status_code == 200
+        assert '12345' not in response.content.decode(), (
+            'Админка не должна показывать текст письма с кодом '
+            'подтверждения.'
+        )
@@ -0,0 +1,143 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import user_cache
+from reviews.models import Title, User
+
+
+def get_client(user):
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == HTTPStatus.OK
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "reviews_user"' in query['sql']
+    ]
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Кэш, общий для процессов, как Redis или Memcached в продакшене."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('shared_cache')
+class Test18ClaimsAuthentication:
+
+    def test_01_no_user_query(self, user):
+        client = get_client(user)
+        title = Title.objects.create(name='Произведение', year=2000)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'text', 'score': 5}
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == user.username
+        assert not user_queries(context), (
+            'Пользователь с актуальным токеном не должен загружаться '
+            'из базы при каждом запросе.'
+        )
+
+    def test_02_full_user_loaded_on_demand(self, user):
+        client = get_client(user)
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['email'] == user.email
+        assert response.json()['bio'] == user.bio
+
+        response = client.patch('/api/v1/users/me/', data={'bio': 'new'})
+        assert response.status_code == HTTPStatus.OK
+        user.refresh_from_db()
+        assert user.bio == 'new'
+        assert client.get('/api/v1/users/me/').status_code == HTTPStatus.OK
+
+    def test_03_role_change_invalidates_token(self, admin_client, user):
+        client = get_client(user)
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'moderator'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), 'После изменения роли выданные токены должны стать недействительны.'
+        response = get_client(user).get('/api/v1/users/me/')
+        assert response.json()['role'] == 'moderator'
+
+    def test_04_cache_miss_falls_back_to_database(self, user):
+        client = get_client(user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert len(user_queries(context)) == 1
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/?year=2000')
+        assert not user_queries(context)
+
+    def test_05_deleted_user(self, admin_client, user):
+        client = get_client(user)
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert client.get('/api/v1/titles/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+
+    def test_06_role_change_in_other_process(self, admin, settings):
+        settings.USER_CACHE_TIMEOUT = 1
+        client = get_client(admin)
+        assert client.get('/api/v1/users/').status_code == HTTPStatus.OK
+        # Так роль меняет другой процесс: сигнал этого процесса не
+        # обновляет кэш, а запись в кэше остаётся до истечения срока.
+        User.objects.filter(pk=admin.pk).update(
+            role=User.USER, token_version=F('token_version') + 1
+        )
+        time.sleep(1.1)
+        assert client.get('/api/v1/users/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), (
+            'Версия токена, изменённая в другом процессе, должна '
+            'перечитываться из базы не позже USER_CACHE_TIMEOUT.'
+        )
+
+    def test_07_local_cache_does_not_trust_claims(self, admin, settings):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }
+        }
+        client = get_client(admin)
+        assert client.get('/api/v1/users/').status_code == HTTPStatus.OK
+        # Версия токена в кэше этого процесса устарела: роль изменена
+        # в другом процессе.
+        User.objects.filter(pk=admin.pk).update(
+            role=User.USER, token_version=F('token_version') + 1
+        )
+        user_cache.clear()
+        assert client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), (
+            'С кэшем в памяти процесса права пользователя должны '
+            'проверяться по базе, а не по данным токена.'
+        )
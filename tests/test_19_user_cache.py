@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import user_cache
+from reviews.models import Title
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "reviews_user"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19UserCache:
+
+    def test_01_user_loaded_once(self, user_client):
+        title = Title.objects.create(name='Произведение', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert user_client.get(url).status_code == HTTPStatus.OK
+        assert user_cache.misses == 1
+
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'text', 'score': 5})
+        assert response.status_code == HTTPStatus.CREATED
+        assert not user_queries(context), (
+            'Пользователь из кэша не должен повторно загружаться из базы.'
+        )
+        assert user_cache.hits == 1
+
+    def test_02_invalidated_on_role_change(self, admin_client, user,
+                                           user_client):
+        assert user_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert user_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.OK
+        ), 'Смена роли должна сразу сбрасывать пользователя в кэше.'
+
+    def test_03_invalidated_on_delete(self, admin_client, user, user_client):
+        assert user_client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.OK
+        )
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert user_client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+
+    def test_04_bounded(self, settings, admin, moderator, user):
+        settings.USER_CACHE_SIZE = 2
+        for cached in (admin, moderator, user):
+            user_cache.set(cached)
+        assert user_cache.get(admin.id, None) is None
+        assert user_cache.get(user.id, None) == user
+        assert user_cache.get(user.id, user.token_version + 1) is None
+
+    def test_05_expires(self, settings, user):
+        settings.USER_CACHE_TIMEOUT = -1
+        user_cache.set(user)
+        assert user_cache.get(user.id, None) is None
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title
+
+URL = '/api/v1/reviews/batch/'
+
+
+def create_titles(count):
+    return [
+        Title.objects.create(name=f'Произведение {number}', year=2000)
+        for number in range(count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20ReviewBatch:
+
+    def test_01_not_auth(self, client):
+        response = client.post(URL, data=[], content_type='application/json')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_02_per_item_results(self, user_client, user):
+        first, second = create_titles(2)
+        Review.objects.create(author=user, title=second, text='old', score=1)
+        response = user_client.post(URL, data=[
+            {'title': first.id, 'text': 'Отлично', 'score': 9},
+            {'title': first.id, 'text': 'Ещё раз', 'score': 2},
+            {'title': second.id, 'text': 'Повтор', 'score': 3},
+            {'title': first.id + 100, 'text': 'Нет такого', 'score': 3},
+            {'title': first.id, 'text': 'Ошибка', 'score': 11},
+        ], format='json')
+        assert response.status_code == HTTPStatus.MULTI_STATUS
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            HTTPStatus.CREATED, HTTPStatus.BAD_REQUEST,
+            HTTPStatus.BAD_REQUEST, HTTPStatus.NOT_FOUND,
+            HTTPStatus.BAD_REQUEST,
+        ], 'Результат должен возвращаться для каждого отзыва по порядку.'
+        review = Review.objects.get(title=first)
+        assert results[0]['review']['id'] == review.id
+        assert results[0]['review']['author'] == user.username
+        assert 'score' in results[4]['errors']
+
+    def test_03_rating_and_caches(self, client, user_client):
+        first, second = create_titles(2)
+        reviews_url = f'/api/v1/titles/{first.id}/reviews/'
+        assert client.get(reviews_url).json()['count'] == 0
+        assert client.get(f'/api/v1/titles/{first.id}/').json()['rating'] is (
+            None
+        )
+        response = user_client.post(URL, data=[
+            {'title': first.id, 'text': 'text', 'score': 8},
+            {'title': second.id, 'text': 'text', 'score': 4},
+        ], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert client.get(reviews_url).json()['count'] == 1, (
+            'После пакетной загрузки должны сбрасываться кэши списков.'
+        )
+        assert client.get(f'/api/v1/titles/{first.id}/').json()['rating'] == 8
+        second.refresh_from_db()
+        assert (second.rating_sum, second.rating_count) == (4, 1)
+
+    def test_04_queries_do_not_grow(self, user_client):
+        titles = create_titles(20)
+
+        def post_batch(client, batch):
+            with CaptureQueriesContext(connection) as context:
+                response = client.post(URL, data=[
+                    {'title': title.id, 'text': 'text', 'score': 5}
+                    for title in batch
+                ], format='json')
+            assert response.status_code == HTTPStatus.CREATED
+            return len(context)
+
+        post_batch(user_client, titles[:1])
+        assert post_batch(user_client, titles[1:3]) == post_batch(
+            user_client, titles[3:]
+        ), (
+            'Количество SQL запросов не должно зависеть от количества '
+            'отзывов в пачке.'
+        )
+        assert Review.objects.count() == 20
+
+    def test_05_limits(self, user_client, settings):
+        settings.REVIEW_BATCH_MAX_SIZE = 1
+        title, = create_titles(1)
+        item = {'title': title.id, 'text': 'text', 'score': 5}
+        response = user_client.post(URL, data=[item, item], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = user_client.post(URL, data=item, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert not Review.objects.exists()
@@ -0,0 +1,118 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title
+
+URL = '/api/v1/titles/bulk/'
+
+
+@pytest.fixture
+def catalogue():
+    Category.objects.create(name='Фильм', slug='films')
+    Category.objects.create(name='Книга', slug='books')
+    for slug in ('drama', 'comedy', 'rock'):
+        Genre.objects.create(name=slug, slug=slug)
+
+
+def titles_data(count, **fields):
+    return [
+        {
+            'name': f'Произведение {number}',
+            'year': 2000,
+            'category': 'films',
+            'genre': ['drama', 'comedy'],
+            **fields,
+        }
+        for number in range(count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('catalogue')
+class Test21TitleBulk:
+
+    def test_01_admin_only(self, user_client):
+        response = user_client.post(URL, data=titles_data(1), format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_02_create_and_update(self, admin_client, client):
+        assert client.get('/api/v1/titles/').json()['count'] == 0
+        response = admin_client.post(URL, data=titles_data(2), format='json')
+        assert response.status_code == HTTPStatus.OK
+        created = response.json()
+        assert [title['name'] for title in created] == [
+            'Произведение 0', 'Произведение 1'
+        ]
+        first = Title.objects.get(id=created[0]['id'])
+        assert set(first.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+
+        response = admin_client.post(URL, data=[
+            {
+                'id': first.id,
+                'name': 'Новое имя',
+                'year': 1999,
+                'category': 'books',
+                'genre': ['comedy', 'rock'],
+            },
+            *titles_data(1),
+        ], format='json')
+        assert response.status_code == HTTPStatus.OK
+        first.refresh_from_db()
+        assert (first.name, first.year, first.category.slug) == (
+            'Новое имя', 1999, 'books'
+        )
+        assert set(first.genre.values_list('slug', flat=True)) == {
+            'comedy', 'rock'
+        }, 'Жанры произведения должны заменяться переданными.'
+        assert response.json()[0]['genre'] == [
+            {'name': 'comedy', 'slug': 'comedy'},
+            {'name': 'rock', 'slug': 'rock'},
+        ]
+        titles = client.get('/api/v1/titles/').json()
+        assert titles['count'] == 3, (
+            'После загрузки пачки должны сбрасываться кэши списков.'
+        )
+
+    def test_03_invalid_batch_saves_nothing(self, admin_client):
+        data = titles_data(3)
+        data[1]['category'] = 'unknown'
+        data[2]['genre'] = ['drama', 'jazz']
+        response = admin_client.post(URL, data=[
+            *data, {**data[0], 'id': 100500}
+        ], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'category' in errors[1]
+        assert 'genre' in errors[2]
+        assert 'id' in errors[3]
+        assert not Title.objects.exists(), (
+            'При ошибке в пачке не должно сохраняться ни одно произведение.'
+        )
+
+    def test_04_queries_do_not_grow(self, admin_client):
+        def post_batch(data):
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(URL, data=data, format='json')
+            assert response.status_code == HTTPStatus.OK
+            return response.json(), len(context)
+
+        post_batch(titles_data(1))
+        small, small_queries = post_batch(titles_data(2))
+        large, large_queries = post_batch(titles_data(30))
+        assert small_queries == large_queries, (
+            'Количество SQL запросов не должно зависеть от количества '
+            'произведений в пачке.'
+        )
+        updates = [
+            {**title, 'category': 'books', 'genre': ['rock']}
+            for title in small + large
+        ]
+        _, update_queries = post_batch(updates[:2])
+        assert post_batch(updates)[1] == update_queries
+        assert Title.objects.filter(category__slug='books').count() == 32
@@ -0,0 +1,82 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import TitleStats
+from tests.utils import create_single_review, create_titles
+
+
+def get_stats(client, title_id):
+    response = client.get(f'/api/v1/titles/{title_id}/?include=stats')
+    assert response.status_code == HTTPStatus.OK
+    return response.json()['stats']
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22TitleStats:
+
+    def test_01_stats_follow_reviews(self, admin_client, user_client,
+                                     moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        assert get_stats(admin_client, title_id) == {
+            'count': 0,
+            'median': None,
+            'histogram': {str(score): 0 for score in range(1, 11)},
+        }
+        create_single_review(user_client, title_id, 'text', 4)
+        review = create_single_review(
+            moderator_client, title_id, 'text', 8
+        ).json()
+        stats = get_stats(admin_client, title_id)
+        assert (stats['count'], stats['median']) == (2, 6)
+        assert stats['histogram']['4'] == stats['histogram']['8'] == 1
+
+        review_url = f'/api/v1/titles/{title_id}/reviews/{review["id"]}/'
+        moderator_client.patch(review_url, data={'score': 2})
+        stats = get_stats(admin_client, title_id)
+        assert (stats['histogram']['8'], stats['histogram']['2']) == (0, 1), (
+            'Распределение оценок должно меняться при изменении оценки.'
+        )
+        assert stats['median'] == 3
+
+        moderator_client.delete(review_url)
+        stats = get_stats(admin_client, title_id)
+        assert (stats['count'], stats['median']) == (1, 4), (
+            'Распределение оценок должно меняться при удалении отзыва.'
+        )
+
+    def test_02_only_on_request(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert 'stats' not in response.json()
+
+        with CaptureQueriesContext(connection) as plain:
+            client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/?include=stats')
+        assert all('stats' in title for title in response.json()['results'])
+        assert len(context) == len(plain), (
+            'Статистика должна загружаться в том же запросе, что и '
+            'произведения.'
+        )
+
+    def test_03_rebuild_and_batch(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        response = user_client.post('/api/v1/reviews/batch/', data=[
+            {'title': title['id'], 'text': 'text', 'score': 7}
+            for title in titles
+        ], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert get_stats(admin_client, titles[1]['id'])['histogram']['7'] == 1
+
+        TitleStats.objects.all().delete()
+        call_command('rebuild_title_stats')
+        stats = TitleStats.objects.get(title_id=titles[0]['id'])
+        assert (stats.count, stats.score_7) == (1, 1), (
+            'Команда `rebuild_title_stats` должна пересчитывать '
+            'распределение оценок по отзывам.'
+        )
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import Category, RankingState, Review, Title, User
+from reviews.ranking import MEAN_SCORE_KEY
+
+
+def create_reviews(title, *scores):
+    for score in scores:
+        number = User.objects.count()
+        author = User.objects.create(
+            username=f'critic{number}', email=f'critic{number}@yamdb.fake'
+        )
+        Review.objects.create(
+            author=author, title=title, text='text', score=score
+        )
+
+
+def names(response):
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23Rankings:
+
+    def test_01_top_weighted(self, client, settings):
+        settings.TITLE_RATING_PRIOR_WEIGHT = 2
+        films = Category.objects.create(name='Фильм', slug='films')
+        popular = Title.objects.create(name='Популярный', year=2000)
+        single = Title.objects.create(name='Один отзыв', year=2000)
+        weak = Title.objects.create(
+            name='Слабый', year=2001, category=films
+        )
+        Title.objects.create(name='Без отзывов', year=2000)
+        create_reviews(weak, 3, 4)
+        create_reviews(popular, 9, 9, 9, 9, 8)
+        create_reviews(single, 10)
+        call_command('refresh_rankings')
+
+        assert names(client.get('/api/v1/titles/top/')) == [
+            'Популярный', 'Один отзыв', 'Слабый', 'Без отзывов'
+        ], (
+            'Произведения с одним высоким отзывом должны быть ниже '
+            'произведений со множеством высоких оценок.'
+        )
+        assert names(client.get('/api/v1/titles/top/?category=films')) == [
+            'Слабый'
+        ]
+        assert names(client.get('/api/v1/titles/top/?year=2000'))[0] == (
+            'Популярный'
+        )
+
+    def test_02_incremental_update(self, settings):
+        settings.TITLE_RATING_PRIOR_WEIGHT = 2
+        first, second = (
+            Title.objects.create(name=name, year=2000)
+            for name in ('Первый', 'Второй')
+        )
+        create_reviews(first, 5, 7)
+        call_command('refresh_rankings')
+        create_reviews(second, 8, 10)
+        second.refresh_from_db()
+        assert second.weighted_rating == pytest.approx((2 * 6 + 18) / 4), (
+            'Взвешенный рейтинг должен обновляться при добавлении отзыва '
+            'со средней оценкой на момент последнего пересчёта.'
+        )
+        Review.objects.filter(title=first).delete()
+        first.refresh_from_db()
+        assert first.weighted_rating == 0
+
+    def test_03_trending(self, client):
+        old, new = (
+            Title.objects.create(name=name, year=2000)
+            for name in ('Старый', 'Новый')
+        )
+        create_reviews(old, 5, 5, 5)
+        Review.objects.update(pub_date=timezone.now() - timedelta(days=30))
+        create_reviews(new, 5)
+        assert names(client.get('/api/v1/titles/trending/')) == [
+            'Старый', 'Новый'
+        ]
+        call_command('refresh_rankings')
+        assert names(client.get('/api/v1/titles/trending/')) == [
+            'Новый', 'Старый'
+        ], 'Старые отзывы не должны учитываться после пересчёта.'
+        assert Title.objects.get(name='Старый').trending_score == 0
+
+    def test_04_keyset_pages(self, client):
+        titles = [
+            Title.objects.create(name=f'Произведение {number:02}', year=2000)
+            for number in range(7)
+        ]
+        for title in titles[:3]:
+            create_reviews(title, 7)
+        response = client.get('/api/v1/titles/top/')
+        first = names(response)
+        assert len(first) == 5
+        second = names(client.get(response.json()['next']))
+        assert len(second) == 2
+        assert not set(first) & set(second)
+        assert set(first[:3]) == {title.name for title in titles[:3]}
+
+    def test_05_mean_shared_between_processes(self, settings):
+        settings.TITLE_RATING_PRIOR_WEIGHT = 2
+        first, second = (
+            Title.objects.create(name=name, year=2000)
+            for name in ('Первый', 'Второй')
+        )
+        create_reviews(first, 4, 6)
+        call_command('refresh_rankings', stdout=StringIO())
+        assert RankingState.objects.get().mean_score == 5.0, (
+            'refresh_rankings должна сохранять среднюю оценку в базе.'
+        )
+
+        # refresh_rankings в другом процессе меняет среднюю оценку,
+        # а кэш этого процесса хранит её MEAN_SCORE_CACHE_TIMEOUT.
+        RankingState.objects.update(mean_score=2.0)
+        cache.delete(MEAN_SCORE_KEY)
+        create_reviews(second, 10)
+        second.refresh_from_db()
+        assert second.weighted_rating == pytest.approx((2 * 2.0 + 10) / 3), (
+            'Рейтинг при записи отзыва должен считаться со средней '
+            'оценкой, сохранённой refresh_rankings.'
+        )
@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments, create_titles
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), [query['sql'] for query in context]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24SparseFields:
+
+    def test_01_title_fields(self, admin_client, client):
+        create_titles(admin_client)
+        full, full_queries = get(client, '/api/v1/titles/')
+        data, queries = get(client, '/api/v1/titles/?fields=id,name,rating')
+        assert [set(title) for title in data['results']] == [
+            {'id', 'name', 'rating'}
+        ] * 2
+        assert [title['name'] for title in data['results']] == [
+            title['name'] for title in full['results']
+        ]
+        assert not any('description' in sql for sql in queries), (
+            'Поля, которых нет в `fields`, не должны загружаться из базы.'
+        )
+        assert len(queries) < len(full_queries), (
+            'Жанры не должны загружаться, если их нет в `fields`.'
+        )
+
+    def test_02_title_detail_fields(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        data, _ = get(
+            client,
+            f'/api/v1/titles/{titles[0]["id"]}/?fields=category&expand=stats'
+        )
+        assert set(data) == {'category', 'stats'}
+        assert data['category']['slug'] == titles[0]['category']
+
+    def test_03_review_and_comment_expand(self, admin_client, user,
+                                          user_client, client):
+        comments, reviews, titles = create_comments(
+            admin_client, {user: user_client}
+        )
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        data, _ = get(client, f'{url}?fields=id,score&expand=title')
+        assert data['results'] == [{
+            'id': reviews[0]['id'],
+            'score': reviews[0]['score'],
+            'title': {
+                'id': title_id,
+                'name': titles[0]['name'],
+                'year': titles[0]['year'],
+            },
+        }]
+        data, _ = get(client, url)
+        assert 'title' not in data['results'][0]
+
+        url = f'{url}{reviews[0]["id"]}/comments/'
+        data, _ = get(client, f'{url}?expand=review&fields=text')
+        assert data['results'] == [{
+            'text': comments[0]['text'],
+            'review': {
+                'id': reviews[0]['id'],
+                'author': user.username,
+                'score': reviews[0]['score'],
+            },
+        }]
+
+    def test_04_fields_ignored_on_write(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/?fields=id',
+            data={'text': 'text', 'score': 5}
+        )
+        assert response.status_code == 201
+        assert {'id', 'text', 'score', 'author'} <= set(response.json())
@@ -0,0 +1,52 @@
+import pytest
+from django.core.cache import cache
+
+from api.rows import RowMapper
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from tests.utils import create_comments
+
+URLS = (
+    '/api/v1/titles/',
+    '/api/v1/titles/?fields=name,genre',
+    '/api/v1/titles/?search=терминатор',
+    '/api/v1/titles/?genre=rock&cursor=',
+    '/api/v1/titles/{title_id}/reviews/',
+    '/api/v1/titles/{title_id}/reviews/?cursor=&fields=text',
+    '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25RowMapper:
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_01_same_bytes(self, admin_client, user, user_client, client,
+                           monkeypatch, url):
+        _, reviews, titles = create_comments(
+            admin_client, {user: user_client}
+        )
+        url = url.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        mapped = []
+        original = RowMapper.map
+        monkeypatch.setattr(
+            RowMapper, 'map',
+            lambda mapper, rows: mapped.append(rows) or original(mapper, rows)
+        )
+        fast = client.get(url)
+        assert fast.status_code == 200
+        assert mapped, 'Список должен выводиться через RowMapper.'
+        cache.clear()
+        for view in (TitleViewSet, ReviewViewSet, CommentViewSet):
+            monkeypatch.setattr(view, 'row_mapper', None)
+        slow = client.get(url)
+        assert fast.content == slow.content, (
+            'Список без сериализатора должен совпадать с ответом '
+            'сериализатора байт в байт.'
+        )
+
+    def test_02_falls_back_for_expand(self, admin_client, client):
+        create_comments(admin_client, {})
+        response = client.get('/api/v1/titles/?expand=stats')
+        assert 'stats' in response.json()['results'][0]
@@ -0,0 +1,70 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+DATA = {
+    'results': [
+        {
+            'id': 1,
+            'name': 'Терминатор  ',
+            'rating': None,
+            'score': Decimal('7.50'),
+            'pub_date': datetime(2021, 1, 2, 3, 4, 5, 678, timezone.utc),
+            'genre': [{'name': 'Рок', 'slug': 'rock'}],
+            'stats': {1: 0, 10: 2},
+            'float': 0.1,
+            'flag': True,
+        },
+    ],
+    'next': None,
+}
+
+
+class Test26JSONRenderer:
+
+    def test_01_same_bytes(self):
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(
+            DATA
+        ), 'FastJSONRenderer должен выводить те же байты, что JSONRenderer.'
+
+    def test_02_fallback(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(
+            DATA
+        ), 'Без orjson FastJSONRenderer должен работать как JSONRenderer.'
+
+    def test_03_indent(self):
+        context = {'indent': 4}
+        assert FastJSONRenderer().render(
+            DATA, renderer_context=context
+        ) == JSONRenderer().render(DATA, renderer_context=context), (
+            'Ответ с отступами должен совпадать с ответом JSONRenderer.'
+        )
+
+    @pytest.mark.parametrize('orjson', (renderers.orjson, None))
+    def test_04_parser(self, monkeypatch, orjson):
+        monkeypatch.setattr(parsers, 'orjson', orjson)
+        body = '{"text": "Отзыв", "score": 7, "genre": ["rock"]}'.encode()
+        assert FastJSONParser().parse(io.BytesIO(body)) == {
+            'text': 'Отзыв', 'score': 7, 'genre': ['rock']
+        }, 'FastJSONParser должен разбирать JSON.'
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"text": '))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_invalid_json(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/categories/', data=b'{"name": ',
+            content_type='application/json'
+        )
+        assert response.status_code == 400, (
+            'Запрос с некорректным JSON должен возвращать статус 400.'
+        )
@@ -0,0 +1,127 @@
+import random
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+
+from reviews.management.commands.generate_data import zipf_rank
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleStats, User)
+
+OPTIONS = {
+    'users': 100,
+    'categories': 2,
+    'genres': 4,
+    'titles': 30,
+    'reviews': 300,
+    'comments': 200,
+    'seed': 7,
+    'batch_size': 64,
+}
+
+
+def generate(**options):
+    call_command('generate_data', stdout=StringIO(), **{
+        **OPTIONS, **options
+    })
+
+
+def snapshot():
+    return (
+        list(Title.objects.order_by('id').values_list(
+            'id', 'name', 'year', 'category_id', 'description'
+        )),
+        list(Title.genre.through.objects.order_by(
+            'title_id', 'genre_id'
+        ).values_list('title_id', 'genre_id')),
+        list(Review.objects.order_by('id').values_list(
+            'id', 'title_id', 'author_id', 'text', 'score'
+        )),
+        list(Comment.objects.order_by('id').values_list(
+            'id', 'review_id', 'author_id', 'text'
+        )),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28GenerateData:
+
+    def test_01_counts(self):
+        generate()
+        for model, name in (
+            (User, 'users'),
+            (Category, 'categories'),
+            (Genre, 'genres'),
+            (Title, 'titles'),
+            (Review, 'reviews'),
+            (Comment, 'comments'),
+        ):
+            assert model.objects.count() == OPTIONS[name], (
+                f'Команда `generate_data` должна создавать `--{name}` '
+                f'объектов.'
+            )
+
+    def test_02_ratings_and_stats(self):
+        generate()
+        titles = Title.objects.annotate(
+            reviews_count=Count('reviews')
+        ).select_related('stats')
+        for title in titles:
+            assert title.rating_count == title.reviews_count, (
+                'После генерации отзывов рейтинг произведений должен быть '
+                'пересчитан.'
+            )
+            assert title.stats.count == title.reviews_count, (
+                'После генерации отзывов статистика оценок должна быть '
+                'пересчитана.'
+            )
+        assert TitleStats.objects.count() == OPTIONS['titles']
+        assert Title.objects.filter(weighted_rating__gt=0).exists(), (
+            'После генерации отзывов должны быть пересчитаны рейтинги.'
+        )
+
+    def test_03_zipf_distribution(self):
+        generate()
+        counts = sorted(
+            Title.objects.values_list('rating_count', flat=True),
+            reverse=True
+        )
+        assert counts[0] >= 3 * OPTIONS['reviews'] / OPTIONS['titles'], (
+            'Количество отзывов к произведениям должно быть распределено '
+            'неравномерно.'
+        )
+        assert counts[0] <= OPTIONS['users'], (
+            'Пользователь не может оставить два отзыва к произведению.'
+        )
+
+    def test_04_deterministic(self):
+        generate()
+        first = snapshot()
+        for model in (Comment, Review, Title, Genre, Category, User):
+            model.objects.all().delete()
+        generate()
+        assert snapshot() == first, (
+            'При одинаковом `--seed` команда `generate_data` должна '
+            'создавать одинаковые данные.'
+        )
+        for model in (Comment, Review, Title, Genre, Category, User):
+            model.objects.all().delete()
+        generate(seed=OPTIONS['seed'] + 1)
+        assert snapshot() != first, (
+            'Другой `--seed` должен давать другие данные.'
+        )
+
+    def test_05_too_many_reviews(self):
+        with pytest.raises(CommandError):
+            generate(reviews=OPTIONS['titles'] * OPTIONS['users'] + 1)
+
+    def test_06_zipf_rank(self):
+        rng = random.Random(0)
+        ranks = Counter(zipf_rank(rng, 100, 1.1) for _ in range(10000))
+        assert min(ranks) == 0 and max(ranks) < 100
+        assert ranks[0] > ranks[1] > ranks[10] > ranks[50], (
+            'Частота ранга должна убывать с его номером.'
+        )
@@ -0,0 +1,77 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from api.management.commands.benchmark_api import percentile
+
+OPTIONS = {
+    'current_database': True,
+    'users': 20,
+    'titles': 20,
+    'reviews': 100,
+    'comments': 50,
+    'requests': 3,
+    'warmup': 1,
+}
+ROUTES = (
+    'categories', 'genres', 'titles', 'titles_category', 'titles_genre',
+    'titles_year', 'titles_name', 'titles_search', 'titles_top',
+    'titles_trending', 'title', 'reviews', 'review', 'comments', 'comment',
+    'users', 'user', 'me', 'signup', 'token', 'title_update', 'titles_bulk',
+    'review_create', 'reviews_batch', 'comment_create',
+)
+
+
+def benchmark(**options):
+    call_command('benchmark_api', stdout=StringIO(), **{
+        **OPTIONS, **options
+    })
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29BenchmarkApi:
+
+    def test_01_results(self, tmp_path):
+        output = tmp_path / 'results.json'
+        benchmark(output=str(output))
+        results = json.loads(output.read_text(encoding='utf-8'))
+        for name in ROUTES:
+            assert name in results['routes'], (
+                f'Команда `benchmark_api` должна измерять маршрут `{name}`.'
+            )
+        for name, result in results['routes'].items():
+            assert result['requests'] == OPTIONS['requests']
+            assert result['errors'] == 0, (
+                f'Маршрут `{name}` вернул неожиданный ответ: '
+                f'{result["statuses"]}'
+            )
+            assert 0 < result['p50'] <= result['p95'] <= result['p99']
+            assert result['rps'] > 0 and result['queries'] >= 0
+
+    def test_02_compare(self, tmp_path):
+        output = tmp_path / 'results.json'
+        benchmark(output=str(output), routes=['titles_top'], cold=True)
+        results = json.loads(output.read_text(encoding='utf-8'))
+        benchmark(
+            routes=['titles_top'], cold=True, compare=str(output),
+            threshold=100
+        )
+
+        route = results['routes']['titles_top']
+        route['p95'] /= 1000
+        route['queries'] -= 1
+        output.write_text(json.dumps(results), encoding='utf-8')
+        with pytest.raises(CommandError, match='titles_top'):
+            benchmark(
+                routes=['titles_top'], cold=True, compare=str(output)
+            )
+
+    def test_03_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([7], 99) == 7
@@ -0,0 +1,151 @@
+import sqlite3
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F
+
+from api.cache import VERSION_KEY
+from api.replicas import PIN_KEY
+from reviews.models import CacheVersion, Review, Title
+
+ALIAS = 'replica'
+
+
+@pytest.fixture
+def replica(transactional_db, settings, tmp_path):
+    """Вторая база SQLite, которая обновляется только вызовом replicate."""
+    name = str(tmp_path / 'replica.sqlite3')
+    connections.databases[ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': name
+    }
+    settings.DATABASE_REPLICAS = [ALIAS]
+
+    def replicate():
+        connections[DEFAULT_DB_ALIAS].ensure_connection()
+        target = sqlite3.connect(name)
+        connections[DEFAULT_DB_ALIAS].connection.backup(target)
+        target.close()
+
+    yield replicate
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    del connections.databases[ALIAS]
+
+
+def age_versions(settings):
+    """Переносит изменения данных на REPLICA_PIN_TIMEOUT секунд назад.
+
+    После этого кэшируемые ответы снова читаются из реплики.
+    """
+    names = list(CacheVersion.objects.values_list('name', flat=True))
+    CacheVersion.objects.update(
+        version=F('version') - settings.REPLICA_PIN_TIMEOUT * 10 ** 9
+    )
+    cache.delete_many([VERSION_KEY.format(name) for name in names])
+
+
+def review_ids(client, title):
+    response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+    assert response.status_code == HTTPStatus.OK
+    return {review['id'] for review in response.json()['results']}
+
+
+class Test30Replicas:
+
+    def test_01_reads_from_replica(self, client, settings, replica):
+        Title.objects.create(name='Старое', year=2000)
+        replica()
+        Title.objects.create(name='Новое', year=2001)
+        age_versions(settings)
+
+        response = client.get('/api/v1/titles/')
+        assert [title['name'] for title in response.json()['results']] == [
+            'Старое'
+        ], 'Чтения GET-запросов к API должны идти в реплику.'
+        assert Title.objects.count() == 2, (
+            'Чтения вне запросов к API должны идти в основную базу.'
+        )
+
+    def test_02_read_your_writes(self, client, user, user_client,
+                                 moderator_client, settings, replica):
+        title = Title.objects.create(name='Произведение', year=2000)
+        replica()
+
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 7}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        review_id = response.json()['id']
+        assert Review.objects.using(ALIAS).count() == 0, (
+            'Запись не должна идти в реплику.'
+        )
+        age_versions(settings)
+
+        assert review_ids(user_client, title) == {review_id}, (
+            'После запроса на запись пользователь должен читать свои '
+            'изменения из основной базы.'
+        )
+        assert review_ids(moderator_client, title) == set(), (
+            'Остальные пользователи должны читать из реплики.'
+        )
+        assert review_ids(client, title) == set()
+
+        cache.delete(PIN_KEY.format(user.pk))
+        assert review_ids(user_client, title) == set(), (
+            'После REPLICA_PIN_TIMEOUT пользователь должен снова читать '
+            'из реплики.'
+        )
+
+    def test_03_failed_write_does_not_pin(self, user, user_client, replica):
+        replica()
+        response = user_client.post(
+            '/api/v1/titles/0/reviews/', data={'text': 'Отзыв', 'score': 7}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert cache.get(PIN_KEY.format(user.pk)) is None
+
+    def test_04_no_replicas(self, client, settings, transactional_db):
+        settings.DATABASE_REPLICAS = []
+        Title.objects.create(name='Произведение', year=2000)
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == 1
+
+    def test_05_recent_change_not_cached_from_replica(self, client,
+                                                       admin_client,
+                                                       settings, replica):
+        title = Title.objects.create(name='Старое', year=2000)
+        age_versions(settings)
+        replica()
+        etag = client.get('/api/v1/titles/')['ETag']
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.id}/', data={'name': 'Новое'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['results'][0]['name'] == 'Новое', (
+            'В течение REPLICA_PIN_TIMEOUT после изменения данных '
+            'кэшируемые ответы должны читаться из основной базы, а не из '
+            'отстающей реплики.'
+        )
+        response = client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_06_local_cache_warning(self, settings, tmp_path):
+        settings.DATABASE_REPLICAS = [ALIAS]
+        assert 'api.W001' in {check.id for check in run_checks()}, (
+            'Реплики с кэшем в памяти процесса должны давать предупреждение '
+            'при запуске.'
+        )
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }}
+        assert 'api.W001' not in {check.id for check in run_checks()}